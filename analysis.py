@@ -3,10 +3,23 @@ Analysis module for quantum simulation results.
 Contains functions for FFT analysis and frequency comb detection.
 """
 
+import functools
 import numpy as np
 from scipy import signal
 from fractions import Fraction
 
+# Use pyFFTW's scipy.fft-compatible interface (with plan caching) if available,
+# otherwise scipy.fft
+from scipy.fft import rfft, rfftfreq
+try:
+    import pyfftw
+    from pyfftw.interfaces.scipy_fft import rfft
+    pyfftw.interfaces.cache.enable()
+    pyfftw.interfaces.cache.set_keepalive_time(60)
+    PYFFTW_AVAILABLE = True
+except ImportError:
+    PYFFTW_AVAILABLE = False
+
 # Try to import pywt but continue if not available
 try:
     import pywt
@@ -15,9 +28,16 @@ except ImportError:
     print("WARNING: PyWavelets not available, some features will be limited")
     PYWT_AVAILABLE = False
 
-from utils import is_harmonic_related
+from utils import is_harmonic_related, is_harmonic_related_batch
 import config
 
+@functools.lru_cache(maxsize=16)
+def _hann_window(n):
+    """Hann window of length n, cached (read-only) since scans reuse the same length."""
+    window = signal.windows.hann(n)
+    window.setflags(write=False)
+    return window
+
 def run_expectation_and_fft_analysis(expectation_values, times, drive_freq, fs=None, num_fft_bins=None):
     """
     Runs FFT analysis on expectation values.
@@ -56,16 +76,15 @@ def run_expectation_and_fft_analysis(expectation_values, times, drive_freq, fs=N
     analysis['fft_bins'] = num_fft_bins
     
     # Apply window function to reduce spectral leakage
-    window = signal.windows.hann(len(times_array))
+    window = _hann_window(len(times_array))
     
-    # Calculate FFT for each component
+    # Calculate FFT for all three components in one batched call
     # NOTE: We use real FFT for real-valued signals
-    mx_fft = np.fft.rfft(mx_values * window, n=num_fft_bins)
-    my_fft = np.fft.rfft(my_values * window, n=num_fft_bins)
-    mz_fft = np.fft.rfft(mz_values * window, n=num_fft_bins)
+    spectra = rfft(np.stack([mx_values, my_values, mz_values]) * window, n=num_fft_bins, axis=-1, workers=-1)
+    mx_fft, my_fft, mz_fft = spectra
     
     # Calculate frequency bins
-    freq_bins = np.fft.rfftfreq(num_fft_bins, d=1/fs)
+    freq_bins = rfftfreq(num_fft_bins, d=1/fs)
     
     # Store complex FFT results for later phase analysis
     analysis['mx_fft_complex_pos'] = mx_fft
@@ -73,10 +92,10 @@ def run_expectation_and_fft_analysis(expectation_values, times, drive_freq, fs=N
     analysis['mz_fft_complex_pos'] = mz_fft
     analysis['positive_frequencies'] = freq_bins
     
-    # Calculate amplitudes (normalized)
-    mx_fft_amp = np.abs(mx_fft) / (len(times_array)/2)
-    my_fft_amp = np.abs(my_fft) / (len(times_array)/2)
-    mz_fft_amp = np.abs(mz_fft) / (len(times_array)/2)
+    # Calculate amplitudes (normalized), again for all three components at once
+    amplitudes = np.abs(spectra)
+    amplitudes /= len(times_array) / 2
+    mx_fft_amp, my_fft_amp, mz_fft_amp = amplitudes
     
     # Store FFT amplitude data
     analysis['mx_fft_pos'] = mx_fft_amp
@@ -100,11 +119,14 @@ def run_expectation_and_fft_analysis(expectation_values, times, drive_freq, fs=N
         analysis['mz_peaks_indices'] = mz_peaks_indices
         
         # Analyze for primary frequencies and subharmonics
-        # We focus on the strongest peaks that aren't DC (zero frequency)
+        # We focus on the strongest peaks that aren't DC (zero frequency).
+        # Frequency bins and peak indices are both increasing, so the peaks above
+        # 0.01 are a tail slice starting at the first bin above it
+        first_non_dc_bin = np.searchsorted(freq_bins, 0.01, side='right')
         
         if len(mx_peaks_indices) > 0:
             # Remove DC component if it's the first peak
-            mx_filtered_indices = mx_peaks_indices[freq_bins[mx_peaks_indices] > 0.01]
+            mx_filtered_indices = mx_peaks_indices[np.searchsorted(mx_peaks_indices, first_non_dc_bin):]
             
             if len(mx_filtered_indices) > 0:
                 # Find the tallest peak
@@ -127,7 +149,7 @@ def run_expectation_and_fft_analysis(expectation_values, times, drive_freq, fs=N
         
         if len(mz_peaks_indices) > 0:
             # Remove DC component if it's the first peak
-            mz_filtered_indices = mz_peaks_indices[freq_bins[mz_peaks_indices] > 0.01]
+            mz_filtered_indices = mz_peaks_indices[np.searchsorted(mz_peaks_indices, first_non_dc_bin):]
             
             if len(mz_filtered_indices) > 0:
                 # Find the tallest peak
@@ -210,8 +232,11 @@ def analyze_fft_peaks_for_fc(analysis,
         if freq not in all_peaks_data or amp > all_peaks_data[freq]['amplitude']:
             all_peaks_data[freq] = {'frequency': freq, 'amplitude': amp, 'basis': 'Mz'}
     
-    for freq, peak_data in all_peaks_data.items():
-        is_related, relation = is_harmonic_related(freq, drive_freq, tolerance=harmonic_tolerance)
+    # Classify all peak frequencies at once
+    peak_freqs = np.fromiter(all_peaks_data.keys(), dtype=float, count=len(all_peaks_data))
+    related_mask, relations = is_harmonic_related_batch(peak_freqs, drive_freq, tolerance=harmonic_tolerance)
+    
+    for (freq, peak_data), is_related, relation in zip(all_peaks_data.items(), related_mask, relations):
         if not is_related:
             ratio_to_drive = freq / drive_freq
             is_potentially_incommensurate = True
@@ -276,11 +301,6 @@ def analyze_frequency_comb(analysis, fc_fft_analysis,
         print("Warning [analyze_frequency_comb]: Missing complex FFT data or frequencies.")
         return results
 
-    # --- Helper function to find nearest index ---
-    def find_nearest_index(array, value):
-        idx = np.searchsorted(array, value, side="left")
-        return idx-1 if idx > 0 and (idx == len(array) or abs(value - array[idx-1]) < abs(value - array[idx])) else idx
-
     # --- Analyze for combs in Mx and Mz separately ---
     for basis, fft_complex in [('mx', mx_fft_complex), ('mz', mz_fft_complex)]:
         best_comb_score_found = float('inf')  # Use a separate variable to track the best score found *during* the loop for this basis
@@ -324,46 +344,50 @@ def analyze_frequency_comb(analysis, fc_fft_analysis,
             if max_teeth < min_comb_teeth:
                 continue  # Skip if we can't even fit minimum teeth
                 
-            comb_freqs = np.array([n * omega_candidate for n in range(1, max_teeth + 1)])
+            comb_freqs = omega_candidate * np.arange(1, max_teeth + 1)
             
-            # Limit to frequencies within our analyzed range
-            valid_teeth_mask = (comb_freqs <= pos_freqs[-1])
-            if np.sum(valid_teeth_mask) < min_comb_teeth:
+            # Limit to frequencies within our analyzed range (teeth are increasing,
+            # so this is a prefix)
+            n_valid_teeth = np.searchsorted(comb_freqs, pos_freqs[-1], side='right')
+            if n_valid_teeth < min_comb_teeth:
                 continue  # Skip if we don't have enough teeth
                 
-            valid_comb_freqs = comb_freqs[valid_teeth_mask]
+            valid_comb_freqs = comb_freqs[:n_valid_teeth]
+            
+            # Find the actual FFT values at these frequencies: nearest frequency bin of
+            # every tooth at once (the lower bin only if it is strictly closer)
+            right_idx = np.searchsorted(pos_freqs, valid_comb_freqs, side="left")
+            left_idx = np.maximum(right_idx - 1, 0)
+            clipped_right_idx = np.minimum(right_idx, len(pos_freqs) - 1)
+            use_left = (right_idx > 0) & (
+                (right_idx == len(pos_freqs)) |
+                (np.abs(valid_comb_freqs - pos_freqs[left_idx]) < np.abs(valid_comb_freqs - pos_freqs[clipped_right_idx])))
+            nearest_idx = np.where(use_left, left_idx, right_idx)
+            
+            # Check which teeth are close enough to a frequency bin
+            freq_diffs = np.abs(pos_freqs[nearest_idx] - valid_comb_freqs)
+            freq_diffs_rel = freq_diffs / valid_comb_freqs
+            tooth_positions = np.flatnonzero(freq_diffs_rel <= freq_tolerance_factor)
             
-            # Find the actual FFT values at these frequencies
             comb_indices = []
             comb_details = []
             
-            for freq in valid_comb_freqs:
-                # Get the nearest index in our frequency array
-                idx = find_nearest_index(pos_freqs, freq)
+            for pos in tooth_positions:
+                # This is a good approximation of a comb tooth
+                idx = nearest_idx[pos]
+                complex_val = fft_complex[idx]
+                comb_indices.append(idx)
                 
-                # Check if this frequency is close enough to a comb tooth location
-                freq_diff = abs(pos_freqs[idx] - freq)
-                freq_diff_rel = freq_diff / freq if freq > 0 else 0
-                
-                if freq_diff_rel <= freq_tolerance_factor:
-                    # This is a good approximation of a comb tooth
-                    complex_val = fft_complex[idx]
-                    amp = np.abs(complex_val) / (len(pos_freqs)/2)  # Normalize
-                    phase = np.angle(complex_val)
-                    
-                    # Store the tooth information
-                    tooth_num = np.where(valid_comb_freqs == freq)[0][0] + 1  # 1-based tooth number
-                    comb_indices.append(idx)
-                    
-                    comb_details.append({
-                        'freq': pos_freqs[idx],
-                        'expected_freq': freq,
-                        'tooth_number': tooth_num,
-                        'freq_error': freq_diff,
-                        'freq_error_rel': freq_diff_rel,
-                        'amplitude': amp,
-                        'phase': phase
-                    })
+                # Store the tooth information
+                comb_details.append({
+                    'freq': pos_freqs[idx],
+                    'expected_freq': valid_comb_freqs[pos],
+                    'tooth_number': pos + 1,  # 1-based tooth number
+                    'freq_error': freq_diffs[pos],
+                    'freq_error_rel': freq_diffs_rel[pos],
+                    'amplitude': np.abs(complex_val) / (len(pos_freqs)/2),  # Normalize
+                    'phase': np.angle(complex_val)
+                })
             
             # We need a minimum number of teeth to consider this a valid comb
             if len(comb_indices) < min_comb_teeth:
@@ -93,7 +93,7 @@ def view_result(result_name):
             result_data = json.load(f)
         
         # Get list of figure files
-        figure_files = glob.glob(os.path.join(result_path, 'figures', '*.png'))
+        figure_files = utils.list_figure_files(os.path.join(result_path, 'figures'))
         figures = [os.path.basename(f) for f in figure_files]
         
         # Get data about the time crystal and frequency comb detection
@@ -119,4 +119,4 @@ def get_figure(result_name, figure_name):
 if __name__ == '__main__':
     # Check dependencies
     utils.ensure_dependencies()
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000, debug=config.FLASK_DEBUG, threaded=True)
\ No newline at end of file
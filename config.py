@@ -20,6 +20,23 @@ os.makedirs(FIGURES_BASE_PATH, exist_ok=True)
 os.makedirs(RESULTS_BASE_PATH, exist_ok=True)
 os.makedirs(NUMERIC_DATA_BASE_PATH, exist_ok=True)
 
+# Image format of the saved analysis plots: 'png' (default), 'webp' or 'jpg'.
+# WebP/JPEG encode faster and are much smaller than PNG.
+PLOT_FORMAT = os.environ.get('QAT_PLOT_FORMAT', 'png').lower()
+if PLOT_FORMAT not in ('png', 'webp', 'jpg'):
+    PLOT_FORMAT = 'png'
+
+# Extensions of the figure files listed by the web app
+FIGURE_EXTENSIONS = ('png', 'webp', 'jpg', 'jpeg', 'svg')
+
+# Flask debug mode (reloader + interactive debugger) for the development servers;
+# off unless FLASK_DEBUG=1
+FLASK_DEBUG = os.environ.get('FLASK_DEBUG', '0') == '1'
+
+# Worker processes for parallel parameter scans when n_jobs=-1 and joblib is
+# not installed (half the cores; each worker runs Aer single-threaded)
+SCAN_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+
 # Default parameters for simulation
 DEFAULT_SIMULATION_PARAMS = {
     "qubits": 3,
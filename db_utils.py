@@ -1,8 +1,34 @@
 """
 Database utility functions for the quantum simulation package.
 """
+import os
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
 from models import db, SimulationResult, FrequencyPeak, CombStructure
 
+# Engine shared by the standalone database maintenance scripts
+_ENGINE = None
+
+def get_engine(db_uri=None):
+    """
+    Get the SQLAlchemy engine used by the standalone database scripts.
+    
+    The engine is created on first use and reused afterwards. These scripts
+    run once and exit, so connections are not pooled.
+    
+    Args:
+        db_uri (str, optional): Database URI (defaults to DATABASE_URL)
+        
+    Returns:
+        sqlalchemy.engine.Engine: The shared engine
+    """
+    global _ENGINE
+    if _ENGINE is None:
+        if db_uri is None:
+            db_uri = os.environ.get("DATABASE_URL", "sqlite:///quantum_sim.db")
+        _ENGINE = create_engine(db_uri, poolclass=NullPool, pool_pre_ping=True)
+    return _ENGINE
+
 def save_simulation_to_db(result, result_name):
     """
     Save simulation results to the database.
@@ -145,40 +171,20 @@ def convert_numpy_type(value):
     """
     Convert numpy types to Python native types for database compatibility.
     
+    NumPy scalars (bool_, integer, floating, ...) and arrays all provide tolist(),
+    which returns the matching Python value (or list) in a single C call, so no
+    per-type isinstance chain (or numpy import) is needed.
+    
     Args:
         value: The value to convert
         
     Returns:
         The converted value as a Python native type
     """
-    # Import numpy only if needed to avoid dependency issues
-    try:
-        import numpy as np
-        
-        # Check if value is a numpy integer type
-        if hasattr(np, 'integer') and isinstance(value, np.integer):
-            return int(value)
-        
-        # Check if value is a numpy floating point type
-        if hasattr(np, 'floating') and isinstance(value, np.floating):
-            return float(value)
-        
-        # Check if value is a numpy array
-        if hasattr(np, 'ndarray') and isinstance(value, np.ndarray):
-            return value.tolist()
-        
-        # Check if value is a numpy boolean
-        if hasattr(np, 'bool_') and isinstance(value, np.bool_):
-            return bool(value)
-        
-        # Special case for numpy scalar types
-        if str(type(value)).startswith("<class 'numpy."):
-            return value.item() if hasattr(value, 'item') else value
-            
-    except (ImportError, AttributeError):
-        pass
+    if type(value).__module__ == 'numpy' and hasattr(value, 'tolist'):
+        return value.tolist()
     
-    # If it's not a numpy type or numpy isn't available, return as is
+    # If it's not a numpy type, return as is
     return value
 
 def save_combs(simulation_id, comb_analysis, log_comb_analysis):
@@ -2,18 +2,34 @@
 Gunicorn configuration for the quantum simulation application.
 """
 
+import os
+
 # Bind to all network interfaces (0.0.0.0) on port 5000
 bind = "0.0.0.0:5000"
 
 # Set worker timeout to 3 minutes (180 seconds) to allow longer-running simulations
 timeout = 180
+graceful_timeout = 180
+keepalive = 5
 
-# Enable auto-reloading for development
-reload = True
+# Auto-reloading (a file watcher in every worker) only for development, with
+# FLASK_DEBUG=1. Otherwise the app is preloaded: NumPy/Qiskit/matplotlib and the
+# app are imported once in the master and shared copy-on-write by the workers.
+reload = os.environ.get('FLASK_DEBUG', '0') == '1'
+preload_app = not reload
 
-# Use a single worker for this application
-workers = 1
+# Several threaded workers, so dashboard pages and figure downloads are served
+# while simulations are running
+workers = max(2, (os.cpu_count() or 2) // 2)
+threads = 8
 
 # Other settings
-worker_class = "sync"
-loglevel = "info"
\ No newline at end of file
+worker_class = "gthread"
+loglevel = "info"
+
+def post_fork(server, worker):
+    """Drop the database connections a preloaded app opened in the master."""
+    if preload_app:
+        from main import app, db
+        with app.app_context():
+            db.engine.dispose(close=False)
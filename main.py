@@ -12,15 +12,18 @@ import traceback
 import threading
 import uuid
 import time
+import functools
 
 # We've simplified the code to not track background simulations explicitly.
 # Each simulation now just appears in the "Completed Simulations" list when it's done.
 
 # Import custom modules
 import config
-from utils import ensure_dependencies
+from utils import ensure_dependencies, load_json, list_figure_files
 from quantum_circuits import get_circuit_generator
-from simulation import run_parameter_scan, generate_parameter_grid
+# run_simulation is imported under another name: the /run_simulation view below
+# is also called run_simulation and would shadow it at module level
+from simulation import run_simulation as run_quantum_simulation, run_parameter_scan, generate_parameter_grid, warm_circuit_templates
 from visualization import plot_circuit_diagram
 
 # Import Flask web application
@@ -28,6 +31,13 @@ from flask import Flask, render_template, request, redirect, url_for, flash, jso
 import glob
 import json
 
+# Flask-Compress is optional: gzip for HTML/JSON/CSS/JS responses
+try:
+    from flask_compress import Compress
+    FLASK_COMPRESS_AVAILABLE = True
+except ImportError:
+    FLASK_COMPRESS_AVAILABLE = False
+
 # Import database models
 from models import db, SimulationResult, FrequencyPeak, CombStructure
 
@@ -43,11 +53,69 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_pre_ping": True,
 }
 
+# Compress text responses (PNG figures are already compressed)
+if FLASK_COMPRESS_AVAILABLE:
+    app.config['COMPRESS_MIMETYPES'] = ['text/html', 'application/json', 'text/css', 'application/javascript']
+    Compress(app)
+
+def _fft_figure_names(simulations):
+    """
+    Find the saved FFT plot of each simulation, in whatever format it was saved.
+    
+    The format is configurable (config.PLOT_FORMAT), so results saved before a
+    change keep their old extension. Uses the same folders as get_figure.
+    
+    Args:
+        simulations (list): SimulationResult records
+        
+    Returns:
+        dict: result_name -> figure file name (fft_analysis.png if none is found)
+    """
+    fft_figures = {}
+    for sim in simulations:
+        folders = []
+        if sim.results_path:
+            folders += [os.path.join(sim.results_path, 'figures'), sim.results_path]
+        folders += [os.path.join('results', sim.result_name, 'figures'), os.path.join('results', sim.result_name)]
+        fft_figures[sim.result_name] = 'fft_analysis.png'
+        for folder in folders:
+            names = [os.path.basename(path) for path in list_figure_files(folder)]
+            match = next((name for name in names if name.rsplit('.', 1)[0] == 'fft_analysis'), None)
+            if match:
+                fft_figures[sim.result_name] = match
+                break
+    return fft_figures
+
+@app.context_processor
+def inject_fft_figures():
+    """Default for templates rendered without fft_figures (views pass the real names)."""
+    return {'fft_figures': {}}
+
 # Initialize the database
 db.init_app(app)
 with app.app_context():
     db.create_all()
 
+# Transpile the default circuit templates in the background so the first
+# simulation of each circuit type doesn't pay for it. This is started by each
+# server process on its first request, not at import: a preloaded gunicorn
+# master would fork its workers mid-transpile (the caches it fills are not
+# shared with them), and scripts importing main would start it too.
+_circuit_warmup_started = False
+_circuit_warmup_lock = threading.Lock()
+
+@app.before_request
+def start_circuit_warmup():
+    """Start the circuit template warm-up once per process."""
+    global _circuit_warmup_started
+    if _circuit_warmup_started:
+        return
+    with _circuit_warmup_lock:
+        if _circuit_warmup_started:
+            return
+        _circuit_warmup_started = True
+    threading.Thread(target=warm_circuit_templates, daemon=True).start()
+
 # Define a custom error handler for 500 errors
 @app.errorhandler(500)
 def internal_server_error(error):
@@ -163,10 +231,10 @@ def index():
                         latest_result_data = json.load(f)
                 
                 # Get list of figure files
-                figure_files = glob.glob(os.path.join(result_path, 'figures', '*.png'))
+                figure_files = list_figure_files(os.path.join(result_path, 'figures'))
                 if not figure_files:
                     # As a fallback, check if there are figures directly in the result path
-                    figure_files = glob.glob(os.path.join(result_path, '*.png'))
+                    figure_files = list_figure_files(result_path)
                 latest_figures = [os.path.basename(f) for f in figure_files]
                 
                 # Get data about the time crystal and frequency comb detection
@@ -314,23 +382,8 @@ def run_parameter_sweep():
             max_val = param_type(float(request.form.get(f'{name}_max', param['max'])))
             steps = int(request.form.get(f'{name}_steps', 3))
             
-            # Generate the range values
-            if param_type == int:
-                # For integers, ensure we get the right number of steps
-                if steps <= 1:
-                    # Only one value in range
-                    values = [min_val]
-                else:
-                    # Generate evenly spaced integer values
-                    step_size = (max_val - min_val) / (steps - 1)
-                    values = [int(min_val + i * step_size) for i in range(steps)]
-                    # Ensure unique values
-                    values = sorted(list(set(values)))
-            else:
-                # For floats, use numpy linspace
-                values = np.linspace(min_val, max_val, steps).tolist()
-            
-            param_ranges[name] = values
+            # The grid expands the range (integer parameters stay integers)
+            param_ranges[name] = {'min': min_val, 'max': max_val, 'steps': steps}
         else:
             # Parameter is fixed, use the single value
             fixed_val = param_type(float(request.form.get(name, param['min'])))
@@ -380,9 +433,6 @@ def run_parameter_sweep():
     else:
         # For a single parameter set, run it directly for each selected circuit type
         try:
-            # Import the simulation function
-            from simulation import run_simulation
-            
             # Get the first (and only) parameter set
             param_set = parameter_sets[0]
             
@@ -393,7 +443,7 @@ def run_parameter_sweep():
                 circuit_scan_name = f"{circuit_type}_{scan_name}" if len(circuit_types) > 1 else scan_name
                 
                 # Run the simulation for this circuit type
-                result = run_simulation(
+                result = run_quantum_simulation(
                     circuit_type=circuit_type,
                     qubits=param_set.get('qubits', 3),
                     shots=param_set.get('shots', 8192),
@@ -506,7 +556,6 @@ def run_sequential_simulations(circuit_type, parameter_sets, scan_name):
                     print(f"Updated parameter sweep record: {sweep_session_id}")
             except Exception as e:
                 print(f"Error creating parameter sweep record: {str(e)}")
-                import traceback
                 traceback.print_exc()
         
         # Run each simulation independently
@@ -523,14 +572,10 @@ def run_sequential_simulations(circuit_type, parameter_sets, scan_name):
                 print(f"Running simulation {i+1}/{total_sets} with parameters: " + 
                       f"qubits={qubits}, time_points={time_points}, drive_param={drive_param}")
                 
-                # Import here to avoid circular imports
-                from simulation import run_simulation
-                from db_utils import save_simulation_to_db
-                
                 # Create a Flask application context for this simulation
                 with app.app_context():
                     # Run the simulation
-                    result = run_simulation(
+                    result = run_quantum_simulation(
                         circuit_type=circuit_type,
                         qubits=param_set.get('qubits', 3),
                         shots=param_set.get('shots', 8192),
@@ -676,14 +721,11 @@ def run_simulation():
         # For smaller simulations, run synchronously as before
         param_set_name = f"web_{circuit_type}_{qubits}q"
         
-        # Import here to avoid circular imports
-        from simulation import run_simulation
-        
         # Generate a unique random seed for this run
         import random
         unique_seed = random.randint(10000, 99999)
         
-        result = run_simulation(
+        result = run_quantum_simulation(
             circuit_type=circuit_type,
             qubits=qubits,
             shots=shots,
@@ -746,10 +788,6 @@ def run_single_simulation(params):
             progress = int((step / total) * 100)
             print(f"Simulation progress: {progress}%")
         
-        # Import run_simulation here to avoid circular imports
-        from simulation import run_simulation
-        from db_utils import save_simulation_to_db
-        
         # Generate a unique random seed for this run
         import random
         unique_seed = random.randint(10000, 99999)
@@ -757,7 +795,7 @@ def run_single_simulation(params):
         # Create an application context for database operations
         with app.app_context():
             # Run the simulation with the progress callback
-            result = run_simulation(
+            result = run_quantum_simulation(
                 circuit_type=params['circuit_type'],
                 qubits=params['qubits'],
                 shots=params['shots'],
@@ -918,15 +956,15 @@ def get_simulation_preview(result_name):
         # Check figures folder first
         figure_path = os.path.join(result_path, 'figures')
         if os.path.exists(figure_path):
-            png_files = sorted(glob.glob(os.path.join(figure_path, '*.png')))
+            png_files = list_figure_files(figure_path)
             figure_files = [os.path.basename(f) for f in png_files]
-            print(f"Found {len(png_files)} PNG files in figures folder")
+            print(f"Found {len(png_files)} figure files in figures folder")
         
         # No figures in figures folder? Check main folder
         if not figure_files and os.path.exists(result_path):
-            png_files = sorted(glob.glob(os.path.join(result_path, '*.png')))
+            png_files = list_figure_files(result_path)
             figure_files = [os.path.basename(f) for f in png_files]
-            print(f"Found {len(png_files)} PNG files in main folder")
+            print(f"Found {len(png_files)} figure files in main folder")
             
         # For the dashboard we want all figures
         preview_figures = figure_files if figure_files else []
@@ -982,6 +1020,85 @@ def get_simulation_preview(result_name):
             "traceback": error_traceback.split('\n')
         }), 500
 
+def _result_dirs_by_mtime():
+    """
+    List the result folders on disk, newest first.
+    
+    Uses a single os.scandir pass (the directory check needs no extra stat) and
+    stats each folder once; its mtime is used for sorting and for the displayed
+    creation time.
+    
+    Returns:
+        tuple: (result_dirs, result_mtimes) where result_mtimes maps each folder
+               ('results/<name>') to its mtime (None if it could not be read)
+    """
+    result_mtimes = {}
+    try:
+        with os.scandir('results') as entries:
+            for entry in entries:
+                if entry.name.startswith('.') or not entry.is_dir():
+                    continue
+                try:
+                    result_mtimes[entry.path] = entry.stat().st_mtime
+                except OSError:
+                    result_mtimes[entry.path] = None
+    except FileNotFoundError:
+        pass
+    result_dirs = sorted(result_mtimes, key=lambda d: result_mtimes[d] or 0, reverse=True)
+    return result_dirs, result_mtimes
+
+def _filesystem_result_details(result_dir):
+    """
+    Read the dashboard details of a result folder from its results.json.
+    
+    Memoized on the modification time and size of results.json itself (not the
+    folder's: rewriting the file in place doesn't change the folder mtime), so
+    repeated dashboard views don't re-open and re-parse the same file.
+    
+    Returns:
+        tuple: (time_points, time_crystal_detected, comb_detected)
+    """
+    results_json = os.path.join(result_dir, 'results.json')
+    try:
+        stat = os.stat(results_json)
+        file_version = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        file_version = None
+    return _read_result_details(results_json, file_version)
+
+@functools.lru_cache(maxsize=256)
+def _read_result_details(results_json, file_version):
+    """Parse the details of _filesystem_result_details (file_version is None if the file is missing)."""
+    time_points = 100
+    time_crystal = False
+    comb_detected_flag = False
+    
+    if file_version is not None:
+        try:
+            with open(results_json, 'r') as f:
+                data = json.load(f)
+            
+            params = data.get('parameters', {})
+            analysis = data.get('analysis', {})
+            
+            time_points = params.get('time_points', 100)
+            time_crystal = analysis.get('has_subharmonics', False)
+            
+            # Get comb detection
+            comb_analysis = data.get('comb_analysis', {})
+            log_comb_analysis = data.get('log_comb_analysis', {})
+            
+            comb_detected_flag = (
+                comb_analysis.get('mx_comb_found', False) or 
+                comb_analysis.get('mz_comb_found', False) or
+                log_comb_analysis.get('mx_log_comb_found', False) or 
+                log_comb_analysis.get('mz_log_comb_found', False)
+            )
+        except:
+            pass
+    
+    return time_points, time_crystal, comb_detected_flag
+
 @app.route('/simple_dashboard')
 def simple_dashboard():
     """Simple dashboard view without JavaScript for troubleshooting."""
@@ -1011,8 +1128,7 @@ def simple_dashboard():
     simulations = []
     
     # Get results from filesystem
-    result_dirs = glob.glob('results/*')
-    result_dirs = sorted(result_dirs, key=os.path.getmtime, reverse=True)
+    result_dirs, result_mtimes = _result_dirs_by_mtime()
     
     for result_dir in result_dirs[:20]:  # Limit to most recent 20
         result_name = os.path.basename(result_dir)
@@ -1029,42 +1145,11 @@ def simple_dashboard():
                 break
         
         # Get creation time from directory
-        try:
-            mtime = os.path.getmtime(result_dir)
-            created_at = datetime.datetime.fromtimestamp(mtime)
-        except:
-            created_at = datetime.datetime.now()
-        
-        # Try to get more details from results.json if it exists
-        time_points = 100
-        time_crystal = False
-        comb_detected_flag = False
+        mtime = result_mtimes[result_dir]
+        created_at = datetime.datetime.fromtimestamp(mtime) if mtime is not None else datetime.datetime.now()
         
-        results_json = os.path.join(result_dir, 'results.json')
-        if os.path.exists(results_json):
-            try:
-                with open(results_json, 'r') as f:
-                    data = json.load(f)
-                
-                params = data.get('parameters', {})
-                analysis = data.get('analysis', {})
-                
-                time_points = params.get('time_points', 100)
-                time_crystal = analysis.get('has_subharmonics', False)
-                
-                # Get comb detection
-                fc_analysis = data.get('fc_analysis', {})
-                comb_analysis = data.get('comb_analysis', {})
-                log_comb_analysis = data.get('log_comb_analysis', {})
-                
-                comb_detected_flag = (
-                    comb_analysis.get('mx_comb_found', False) or 
-                    comb_analysis.get('mz_comb_found', False) or
-                    log_comb_analysis.get('mx_log_comb_found', False) or 
-                    log_comb_analysis.get('mz_log_comb_found', False)
-                )
-            except:
-                pass
+        # Try to get more details from results.json if it exists (cached until the file changes)
+        time_points, time_crystal, comb_detected_flag = _filesystem_result_details(result_dir)
         
         # Create a simulation object for this result
         fs_sim = FilesystemSimulation(
@@ -1149,8 +1234,7 @@ def dashboard():
         db_error = str(e)
     
     # Always check filesystem for recent results, especially those not in the database
-    result_dirs = glob.glob('results/*')
-    result_dirs = sorted(result_dirs, key=os.path.getmtime, reverse=True)
+    result_dirs, result_mtimes = _result_dirs_by_mtime()
     
     # Get existing result names from database to avoid duplicates
     db_result_names = {sim.result_name for sim in simulations}
@@ -1175,42 +1259,11 @@ def dashboard():
                 break
         
         # Get creation time from directory
-        try:
-            mtime = os.path.getmtime(result_dir)
-            created_at = datetime.datetime.fromtimestamp(mtime)
-        except:
-            created_at = datetime.datetime.now()
+        mtime = result_mtimes[result_dir]
+        created_at = datetime.datetime.fromtimestamp(mtime) if mtime is not None else datetime.datetime.now()
         
-        # Try to get more details from results.json if it exists
-        time_points = 100
-        time_crystal = False
-        comb_detected_flag = False
-        
-        results_json = os.path.join(result_dir, 'results.json')
-        if os.path.exists(results_json):
-            try:
-                with open(results_json, 'r') as f:
-                    data = json.load(f)
-                
-                params = data.get('parameters', {})
-                analysis = data.get('analysis', {})
-                
-                time_points = params.get('time_points', 100)
-                time_crystal = analysis.get('has_subharmonics', False)
-                
-                # Get comb detection
-                fc_analysis = data.get('fc_analysis', {})
-                comb_analysis = data.get('comb_analysis', {})
-                log_comb_analysis = data.get('log_comb_analysis', {})
-                
-                comb_detected_flag = (
-                    comb_analysis.get('mx_comb_found', False) or 
-                    comb_analysis.get('mz_comb_found', False) or
-                    log_comb_analysis.get('mx_log_comb_found', False) or 
-                    log_comb_analysis.get('mz_log_comb_found', False)
-                )
-            except:
-                pass
+        # Try to get more details from results.json if it exists (cached until the file changes)
+        time_points, time_crystal, comb_detected_flag = _filesystem_result_details(result_dir)
         
         # Apply filters if needed
         if circuit_type and circuit_type != circuit_type:
@@ -1423,10 +1476,10 @@ def view_result(result_name):
                 result_path = db_result.results_path
                 
                 # Get list of figure files - check figures folder
-                figure_files = glob.glob(os.path.join(result_path, 'figures', '*.png'))
+                figure_files = list_figure_files(os.path.join(result_path, 'figures'))
                 if not figure_files:
                     # As a fallback, check if there are figures directly in the result path
-                    figure_files = glob.glob(os.path.join(result_path, '*.png'))
+                    figure_files = list_figure_files(result_path)
                 figures = [os.path.basename(f) for f in figure_files]
                 
                 # Build a result data structure from database
@@ -1475,9 +1528,8 @@ def view_result(result_name):
         if not os.path.exists(result_data_path):
             # Try to build from analysis results
             analysis_path = os.path.join(result_path, 'data', 'analysis_results.json')
-            if os.path.exists(analysis_path):
-                with open(analysis_path, 'r') as f:
-                    analysis = json.load(f)
+            analysis = load_json(analysis_path)
+            if analysis is not None:
                 result_data = {
                     'parameters': analysis.get('parameters', {}),
                     'time_crystal_detected': analysis.get('basic_analysis', {}).get('has_subharmonics', False),
@@ -1493,10 +1545,10 @@ def view_result(result_name):
                 result_data = json.load(f)
         
         # Get list of figure files - check figures folder
-        figure_files = glob.glob(os.path.join(result_path, 'figures', '*.png'))
+        figure_files = list_figure_files(os.path.join(result_path, 'figures'))
         if not figure_files:
             # As a fallback, check if there are figures directly in the result path
-            figure_files = glob.glob(os.path.join(result_path, '*.png'))
+            figure_files = list_figure_files(result_path)
         figures = [os.path.basename(f) for f in figure_files]
         
         # Get data about the time crystal and frequency comb detection
@@ -1587,7 +1639,8 @@ def get_circuit_at_t1(circuit_type, qubits):
         
         # Return the image
         if fig_path and isinstance(fig_path, str) and os.path.exists(fig_path):
-            return send_file(fig_path, mimetype='image/png')
+            mime_type = 'image/svg+xml' if fig_path.lower().endswith('.svg') else 'image/png'
+            return send_file(fig_path, mimetype=mime_type)
         else:
             return "Failed to generate circuit diagram", 500
     
@@ -1637,6 +1690,8 @@ def get_figure(result_name, figure_name):
                 mime_type = None
                 if path.lower().endswith('.png'):
                     mime_type = 'image/png'
+                elif path.lower().endswith('.webp'):
+                    mime_type = 'image/webp'
                 elif path.lower().endswith('.jpg') or path.lower().endswith('.jpeg'):
                     mime_type = 'image/jpeg'
                 elif path.lower().endswith('.svg'):
@@ -1647,12 +1702,12 @@ def get_figure(result_name, figure_name):
                     mimetype=mime_type,
                     as_attachment=False,
                     download_name=figure_name,
-                    max_age=0  # Don't cache
+                    max_age=0,
+                    conditional=True  # ETag/Last-Modified, answers revalidation with 304
                 )
-                # Add headers to prevent caching issues
-                response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-                response.headers['Pragma'] = 'no-cache'
-                response.headers['Expires'] = '0'
+                # Browsers may keep the figure but must revalidate it on every use, so a
+                # regenerated figure is picked up while an unchanged one isn't re-downloaded
+                response.headers['Cache-Control'] = 'no-cache, must-revalidate, max-age=0'
                 return response
             except Exception as e:
                 print(f"Error sending file {path}: {e}")
@@ -1701,20 +1756,17 @@ def main():
                     return
                 elif param == 'web':
                     # Run the web interface
-                    app.run(host='0.0.0.0', port=5000, debug=True)
+                    app.run(host='0.0.0.0', port=5000, debug=config.FLASK_DEBUG, threaded=True)
                     return
     
     print(f"Running {circuit_type} simulation with {qubits} qubits...")
     
-    # Import here to avoid circular imports
-    from simulation import run_simulation
-    
     # Generate a unique random seed for this run
     import random
     unique_seed = random.randint(10000, 99999)
     
     # Run a single simulation with the specified parameters
-    result = run_simulation(
+    result = run_quantum_simulation(
         circuit_type=circuit_type,
         qubits=qubits,
         shots=shots,
@@ -1812,7 +1864,8 @@ def sweep_preview(sweep_session):
     # Get all simulations for this sweep
     simulations = SimulationResult.query.filter_by(sweep_session=sweep_session).order_by(SimulationResult.sweep_index).all()
     
-    return render_template('sweep_preview.html', sweep=sweep, simulations=simulations)
+    return render_template('sweep_preview.html', sweep=sweep, simulations=simulations,
+                           fft_figures=_fft_figure_names(simulations))
 
 @app.route('/sweep_grid/<sweep_session>')
 def view_sweep_grid(sweep_session):
@@ -1906,7 +1959,8 @@ def view_sweep_grid(sweep_session):
                               display_mode=display_mode,
                               grid_lookup=grid_lookup,
                               circuit_type=circuit_type_name,
-                              created_at=created_at)
+                              created_at=created_at,
+                              fft_figures=_fft_figure_names(simulations))
     
     except Exception as e:
         print(f"Error viewing sweep grid: {str(e)}")
@@ -1993,11 +2047,7 @@ def export_simulation_data(result_name):
         
         # Load analysis data
         analysis_file = os.path.join(results_path, 'analysis_results.json')
-        if os.path.exists(analysis_file):
-            with open(analysis_file, 'r') as f:
-                analysis_data = json.load(f)
-        else:
-            analysis_data = {}
+        analysis_data = load_json(analysis_file) or {}
         
         # Create CSV file
         import csv
@@ -2047,13 +2097,18 @@ def export_simulation_data(result_name):
             comb_analysis = analysis_data.get('linear_comb_analysis', {})
         
         # Attempt to find FFT data
-        # First check for fft_data.json if it exists
+        # First check for fft_data.json(.gz) if it exists; the spectra themselves are
+        # stored in arrays.npz (older results kept them in fft_data.json)
         fft_data_path = os.path.join(results_path, 'numeric_data', 'fft_data.json')
-        fft_data = None
+        fft_arrays_path = os.path.join(results_path, 'numeric_data', 'arrays.npz')
+        fft_data = load_json(fft_data_path)
         
-        if os.path.exists(fft_data_path):
-            with open(fft_data_path, 'r') as f:
-                fft_data = json.load(f)
+        if os.path.exists(fft_arrays_path):
+            fft_data = fft_data or {}
+            with np.load(fft_arrays_path) as arrays:
+                for key in ('positive_frequencies', 'mx_fft_pos', 'my_fft_pos', 'mz_fft_pos'):
+                    if key in arrays:
+                        fft_data[key] = arrays[key]
         
         # If we have FFT data directly available
         if fft_data and 'positive_frequencies' in fft_data:
@@ -2062,7 +2117,7 @@ def export_simulation_data(result_name):
             my_amp = fft_data.get('my_fft_pos', [])
             mz_amp = fft_data.get('mz_fft_pos', [])
             
-            if frequencies and len(frequencies) > 0:
+            if len(frequencies) > 0:
                 # This is a simplified approach since phase data might not be available
                 for i in range(len(frequencies)):
                     if i < len(mx_amp):
@@ -2,7 +2,8 @@
 Entry point for the web application.
 This file starts the Flask application.
 """
+import config
 from app import app
 
 if __name__ == "__main__":
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000, debug=config.FLASK_DEBUG, threaded=True)
\ No newline at end of file
@@ -6,6 +6,13 @@ import datetime
 import json
 from flask_sqlalchemy import SQLAlchemy
 
+# orjson is optional: faster, and serializes NumPy arrays/scalars natively
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 db = SQLAlchemy()
 
 class SimulationResult(db.Model):
@@ -54,7 +61,10 @@ class SimulationResult(db.Model):
     
     def set_extra_data(self, data_dict):
         """Serialize dictionary to JSON string for storage."""
-        self.extra_data = json.dumps(data_dict)
+        if ORJSON_AVAILABLE:
+            self.extra_data = orjson.dumps(data_dict, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+        else:
+            self.extra_data = json.dumps(data_dict)
     
     def get_extra_data(self):
         """Deserialize JSON string to dictionary."""
@@ -3,6 +3,7 @@ Quantum circuit generation module.
 Contains functions to create different types of quantum circuits.
 """
 
+import functools
 import numpy as np
 from qiskit import QuantumCircuit, transpile
 from qiskit.circuit import Parameter
@@ -475,8 +476,9 @@ def create_string_twistor_fc_circuit(qubits, shots, drive_steps, init_state=None
     
     return qc, t
 
+@functools.lru_cache(maxsize=None)
 def get_circuit_generator(circuit_type):
-    """Returns the appropriate circuit generator function based on the circuit type."""
+    """Returns the appropriate circuit generator function based on the circuit type (memoized)."""
     circuit_generators = {
         'penrose': create_penrose_circuit,
         'qft_basic': create_qft_basic_circuit,
@@ -11,19 +11,307 @@ import traceback
 import pandas as pd
 import time
 import sys
+import math
+import random
 import itertools
-from qiskit import transpile
-from qiskit.quantum_info import Statevector
+import functools
+import hashlib
+import pickle
+import csv
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+try:
+    from joblib import Parallel, delayed, parallel_backend
+    JOBLIB_AVAILABLE = True
+except ImportError:
+    JOBLIB_AVAILABLE = False
+try:
+    from rustpy_xlsxwriter import FastExcel
+    FASTEXCEL_AVAILABLE = True
+except ImportError:
+    FASTEXCEL_AVAILABLE = False
+try:
+    import xlsxwriter
+    XLSXWRITER_AVAILABLE = True
+except ImportError:
+    XLSXWRITER_AVAILABLE = False
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+from qiskit import QuantumCircuit, transpile
+from qiskit.circuit import Parameter
+from qiskit.quantum_info import SparsePauliOp
+
+# Importing SaveStatevector also registers QuantumCircuit.save_statevector
+# (try both import paths for different Qiskit versions)
+try:
+    from qiskit_aer.library import SaveStatevector
+except ImportError:
+    try:
+        from qiskit.providers.aer.library import SaveStatevector
+    except ImportError:
+        # If we can't import at all, we'll just use the basic circuit
+        print("SaveStatevector not available in this installation")
+        SaveStatevector = None
 
 # We'll import the AerSimulator from quantum_circuits module
 # which has proper fallback handling
-from quantum_circuits import AerSimulator
+from quantum_circuits import AerSimulator, DummyAerSimulator
 
 import config
-from utils import is_harmonic_related, format_param, create_folder_structure, setup_gdrive_if_needed, save_to_gdrive
+from utils import is_harmonic_related, create_folder_structure, setup_gdrive_if_needed, save_to_gdrive, save_json
 from quantum_circuits import get_circuit_generator
 from analysis import run_expectation_and_fft_analysis, analyze_fft_peaks_for_fc, analyze_frequency_comb, analyze_log_frequency_comb
-from visualization import plot_expectation_values, plot_fft_analysis, plot_frequency_comb_analysis, plot_log_comb_analysis, plot_circuit_diagram
+from visualization import plot_expectation_values, plot_fft_analysis, plot_frequency_comb_analysis, plot_log_comb_analysis, plot_circuit_diagram, plot_all_async, clear_figure_pool
+
+# Fixed columns of the parameter scan summary (followed by the scanned
+# parameters and, for failed sets, error_message)
+SUMMARY_FIELDS = ['param_set', 'status', 'has_subharmonics', 'incommensurate_count',
+                  'mx_comb_found', 'mx_comb_teeth', 'mz_comb_found', 'mz_comb_teeth',
+                  'mx_log_comb_found', 'mz_log_comb_found', 'elapsed_time']
+
+# Bump this whenever the simulation/analysis pipeline changes so that
+# results cached on disk by run_parameter_scan are invalidated.
+CODE_VERSION = b'1'
+
+# Thread limit for AerSimulator in this process (None: use all cores). Parameter
+# scan workers set it to 1 so N worker processes don't each start N Aer threads.
+_AER_MAX_THREADS = None
+
+# Background writer for the binary result arrays (NumPy releases the GIL while
+# compressing, so the write overlaps with plotting and the JSON output)
+_IO_POOL = ThreadPoolExecutor(max_workers=2)
+
+def _reset_io_pool():
+    """
+    Give a forked child process (parameter scan worker) its own writer pool.
+    
+    The child inherits the executor but not its threads, so jobs submitted to
+    the inherited pool would never run.
+    """
+    global _IO_POOL
+    _IO_POOL = ThreadPoolExecutor(max_workers=2)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_io_pool)
+
+# run_simulation arguments that only control output/presentation, not the result;
+# they are left out of the cache key so e.g. which set of a scan draws the circuit
+# diagram doesn't cause cache misses on a re-run. save_results stays in the key, so
+# the first saving scan of a parameter set always runs and saves it (cache hits are
+# not saved again, see _RESULT_PATH_FIELDS).
+_CACHE_KEY_EXCLUDE = frozenset({'param_set_name', 'show_plots',
+                                'plot_circuit', 'verbose', 'save_analysis_json'})
+
+# Result fields pointing at the run's output folders. A cache hit doesn't run (or
+# save) the simulation again, so these are cleared rather than pointing at the
+# folders of the run that filled the cache, which may have been deleted since.
+_RESULT_PATH_FIELDS = ('results_path', 'figures_path', 'numeric_data_path')
+
+def _result_cache_path(cache_dir, sim_params):
+    """
+    Path of the cached result for a set of simulation parameters.
+    
+    The key is a blake2b hash of the canonical (sorted) parameters that affect the
+    result, plus CODE_VERSION.
+    """
+    key_params = {key: value for key, value in sim_params.items() if key not in _CACHE_KEY_EXCLUDE}
+    canon_params = json.dumps(key_params, sort_keys=True, default=str).encode()
+    key = hashlib.blake2b(canon_params + CODE_VERSION).hexdigest()[:32]
+    return os.path.join(cache_dir, f"{key}.pkl")
+
+def _write_summary_xlsx(summary_df, path):
+    """
+    Write the scan summary DataFrame to an Excel file.
+    
+    Uses rustpy-xlsxwriter (Rust writer fed directly from the DataFrame) when
+    installed, then XlsxWriter in constant-memory mode (rows are streamed to
+    disk), and pandas/openpyxl as the last resort.
+    """
+    if FASTEXCEL_AVAILABLE:
+        FastExcel(path).sheet('Scan Results', summary_df).save()
+    elif XLSXWRITER_AVAILABLE:
+        # Constant-memory mode flushes each row once a later row is written, so
+        # cells must be written in row order (pandas' to_excel writes by column)
+        workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+        try:
+            worksheet = workbook.add_worksheet('Scan Results')
+            worksheet.write_row(0, 0, [str(col) for col in summary_df.columns])
+            # Series.tolist gives plain Python values; NaN is written as an empty cell
+            columns = [summary_df[col].tolist() for col in summary_df.columns]
+            for row_idx, row in enumerate(zip(*columns), start=1):
+                worksheet.write_row(row_idx, 0, [None if value != value else value for value in row])
+        finally:
+            workbook.close()
+    else:
+        summary_df.to_excel(path, index=False, sheet_name='Scan Results')
+
+def _z_expvals_numpy(keys, vals, num_qubits):
+    """
+    Per-qubit Z expectation values from measurement counts.
+    
+    Args:
+        keys (np.ndarray): Measured basis states as integers (int64)
+        vals (np.ndarray): Number of shots for each state (int64)
+        num_qubits (int): Number of qubits
+    
+    Returns:
+        np.ndarray: <Z_q> for each qubit (+1 for |0⟩ and -1 for |1⟩, normalized by total shots)
+    """
+    bits = (keys[None, :] >> np.arange(num_qubits)[:, None]) & 1
+    return ((1 - 2 * bits) * vals).sum(axis=1) / vals.sum()
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _z_expvals(keys, vals, num_qubits):
+        """Compiled version of _z_expvals_numpy (single pass over the counts, no temporaries)."""
+        out = np.zeros(num_qubits)
+        total = 0
+        for k in range(keys.size):
+            v = vals[k]
+            total += v
+            key = keys[k]
+            for q in range(num_qubits):
+                out[q] += (1 - 2 * ((key >> q) & 1)) * v
+        return out / total
+else:
+    _z_expvals = _z_expvals_numpy
+
+@functools.lru_cache(maxsize=None)
+def _magnetization_ops(qubits):
+    """
+    Qubit-averaged magnetization observables, e.g. mz = (1/n) * sum_q Z_q.
+    
+    Returns:
+        dict: Result label ('mx', 'my', 'mz') -> SparsePauliOp
+    """
+    return {
+        f'm{pauli.lower()}': SparsePauliOp.from_sparse_list(
+            [(pauli, [q], 1.0 / qubits) for q in range(qubits)], num_qubits=qubits)
+        for pauli in ('X', 'Y', 'Z')
+    }
+
+def _attach_save_instructions(qc, aer_method, qubits):
+    """
+    Attach the result-saving instructions to a circuit (in place).
+    
+    For statevector runs Aer computes the magnetizations itself via
+    save_expectation_value when available, so the statevector never has to be
+    copied back to Python; otherwise the full statevector is saved. Other
+    methods measure all qubits.
+    
+    Returns:
+        bool: True if mx/my/mz are saved as expectation values
+    """
+    if aer_method != 'statevector':
+        qc.measure_all()
+        return False
+    
+    if hasattr(qc, 'save_expectation_value'):
+        for label, op in _magnetization_ops(qubits).items():
+            qc.save_expectation_value(op, range(qubits), label=label)
+        return True
+    
+    # Try to add save_statevector instruction (method may not exist in some versions)
+    try:
+        qc.save_statevector()
+    except AttributeError:
+        print("Warning: save_statevector not available - using basic circuit")
+    return False
+
+def _parameter_binder(circuit):
+    """
+    Resolve the parameter binding method of a circuit once.
+    
+    Returns assign_parameters (newer Qiskit API), bind_parameters (older Qiskit API),
+    or None if neither exists.
+    """
+    return getattr(circuit, 'assign_parameters', None) or getattr(circuit, 'bind_parameters', None)
+
+@functools.lru_cache(maxsize=8)
+def _get_simulator(aer_method, max_threads=None):
+    """
+    Shared AerSimulator for a simulation method and thread limit.
+    
+    Memoized, so a scan (or the web app) doesn't construct a new backend for every
+    simulation. Runs don't change the backend's options, so the instance can be
+    shared between threads; worker processes each build their own.
+    
+    Args:
+        aer_method (str): Simulation method
+        max_threads (int): Thread limit (None: all cores, with parallel experiments)
+    """
+    if max_threads:
+        return AerSimulator(method=aer_method, max_parallel_threads=max_threads,
+                            max_parallel_experiments=max_threads)
+    return AerSimulator(method=aer_method, max_parallel_experiments=os.cpu_count())
+
+@functools.lru_cache(maxsize=64)
+def _build_and_transpile(circuit_type, qubits, shots, drive_steps, init_state, aer_method):
+    """
+    Build a parameterized circuit and its transpiled run template.
+    
+    The drive strength is a circuit Parameter too, so the template is memoized on
+    the structural parameters only: scans over drive_param (or time settings)
+    reuse one transpiled circuit and just bind new values. The returned circuits
+    are shared between callers and must not be modified in place.
+    
+    Returns:
+        tuple: (circuit, run_template, t, drive, saves_expectations) where run_template is
+               the transpiled circuit with the save/measure instructions attached, t and drive
+               are the time and drive strength Parameters (drive is None if the transpiled
+               circuit doesn't depend on it) and saves_expectations tells whether mx/my/mz
+               are computed by Aer
+    """
+    circuit_generator = get_circuit_generator(circuit_type)
+    drive = Parameter('drive')
+    circuit, t = circuit_generator(qubits, shots, drive_steps, init_state, drive)
+    simulator = _get_simulator(aer_method)
+    
+    # Transpile the parameterized circuit once - only t and drive change between runs
+    # (with try/except for compatibility). The statevector engine runs arbitrary gates
+    # directly, so the optimization passes only cost time there.
+    try:
+        if aer_method == 'statevector':
+            transpiled_circuit = transpile(circuit, simulator, optimization_level=0)
+        else:
+            transpiled_circuit = transpile(circuit, simulator)
+    except (TypeError, AttributeError):
+        # Fallback if transpile fails
+        print(f"Warning: Transpilation failed. Using original circuit.")
+        transpiled_circuit = circuit
+    
+    # Attach the save/measure instructions once to a template circuit
+    run_template = transpiled_circuit.copy()
+    saves_expectations = _attach_save_instructions(run_template, aer_method, qubits)
+    if drive not in run_template.parameters:
+        drive = None
+    
+    return circuit, run_template, t, drive, saves_expectations
+
+def warm_circuit_templates(circuit_types=('penrose', 'qft_basic', 'comb_generator', 'comb_twistor',
+                                          'graphene_fc', 'string_twistor_fc'),
+                           aer_method='statevector'):
+    """
+    Build and transpile the default-shape template of each circuit type ahead of time.
+    
+    Fills the _build_and_transpile cache (config.DEFAULT_SIMULATION_PARAMS shape), so
+    the first simulation of each type only binds t and the drive strength.
+    
+    Args:
+        circuit_types (tuple): Circuit types to prepare
+        aer_method (str): Simulation method the templates are transpiled for
+    """
+    defaults = config.DEFAULT_SIMULATION_PARAMS
+    for circuit_type in circuit_types:
+        try:
+            _build_and_transpile(circuit_type, defaults['qubits'], defaults['shots'],
+                                 defaults['drive_steps'], defaults['init_state'], aer_method)
+        except Exception as e:
+            print(f"Warning: Could not prepare the {circuit_type} circuit template: {e}")
 
 def run_simulation(circuit_type, qubits=3, shots=8192, drive_steps=5,
                   time_points=100, max_time=10.0, drive_param=0.9,
@@ -32,7 +320,7 @@ def run_simulation(circuit_type, qubits=3, shots=8192, drive_steps=5,
                   sweep_value1=None, sweep_param2=None, sweep_value2=None,
                   save_results=True, show_plots=False, aer_method='statevector',
                   plot_circuit=True, verbose=True, progress_callback=None, 
-                  seed=None):
+                  seed=None, save_analysis_json=True):
     """
     Run a single quantum simulation with specified parameters.
     
@@ -52,6 +340,7 @@ def run_simulation(circuit_type, qubits=3, shots=8192, drive_steps=5,
         plot_circuit (bool): Whether to plot the circuit diagram
         verbose (bool): Whether to print progress messages
         progress_callback (function): Optional callback function for progress updates (step, total)
+        save_analysis_json (bool): Whether to write analysis_results.json.gz for this run
     
     Returns:
         dict: Results of the simulation, including analysis
@@ -61,7 +350,6 @@ def run_simulation(circuit_type, qubits=3, shots=8192, drive_steps=5,
     
     # Set random seed if provided, otherwise generate a unique one
     if seed is None:
-        import random
         seed = random.randint(10000, 99999)
     
     # Use seed for reproducibility but uniqueness across runs
@@ -75,16 +363,14 @@ def run_simulation(circuit_type, qubits=3, shots=8192, drive_steps=5,
         fig_path, res_path, data_path = None, None, None
         gdrive_save_path = None
     
-    # Get the circuit generator function
+    # Generate the circuit with time parameter and its transpiled run template
+    # (memoized, so repeated circuit shapes in a scan are only built once)
     try:
-        circuit_generator = get_circuit_generator(circuit_type)
+        circuit, run_template, t, drive, saves_expectations = _build_and_transpile(
+            circuit_type, qubits, shots, drive_steps, init_state, aer_method)
     except ValueError as e:
         print(f"Error: {e}")
         return {"error": str(e)}
-    
-    # Generate the circuit with time parameter
-    try:
-        circuit, t = circuit_generator(qubits, shots, drive_steps, init_state, drive_param)
     except Exception as e:
         print(f"Error generating circuit: {e}")
         traceback.print_exc()
@@ -117,12 +403,9 @@ def run_simulation(circuit_type, qubits=3, shots=8192, drive_steps=5,
             # Plot with t=1.0 to show the structure
             sample_t_value = 1.0
             param_dict = {viz_t: sample_t_value}
-            if hasattr(viz_circuit, 'assign_parameters'):
-                # Use newer Qiskit 2.0 API
-                bound_viz_circuit = viz_circuit.assign_parameters(param_dict)
-            elif hasattr(viz_circuit, 'bind_parameters'):
-                # Use older Qiskit API
-                bound_viz_circuit = viz_circuit.bind_parameters(param_dict)
+            viz_bind = _parameter_binder(viz_circuit)
+            if viz_bind is not None:
+                bound_viz_circuit = viz_bind(param_dict)
             else:
                 bound_viz_circuit = viz_circuit  # Fallback
 
@@ -138,7 +421,7 @@ def run_simulation(circuit_type, qubits=3, shots=8192, drive_steps=5,
 
     # Create the simulator
     try:
-        simulator = AerSimulator(method=aer_method)
+        simulator = _get_simulator(aer_method, _AER_MAX_THREADS)
     except Exception as e:
         print(f"Error creating simulator: {e}")
         return {"error": f"Simulator creation failed: {str(e)}"}
@@ -160,141 +443,113 @@ def run_simulation(circuit_type, qubits=3, shots=8192, drive_steps=5,
     if verbose:
         print(f"Starting simulation across {time_points} time points...")
     
-    for i, time_val in enumerate(times):
-        # Report progress via callback if provided
-        if progress_callback is not None:
-            progress_callback(i, time_points)
-        
-        # Handle different versions of parameter binding API
+    # Index tables for the qubit-averaged magnetizations, computed directly on the
+    # amplitude array (little-endian: bit q of basis index k is (k >> q) & 1)
+    if aer_method == 'statevector' and not saves_expectations:
+        basis_idx = np.arange(2 ** qubits)
+        qubit_idx = np.arange(qubits)[:, None]
+        # +1 where qubit q is |0>, -1 where it is |1> (shape: qubits x 2^n)
+        z_sign = 1.0 - 2.0 * ((basis_idx >> qubit_idx) & 1)
+        # Basis index with qubit q flipped, for the X/Y off-diagonal terms
+        flip_idx = basis_idx ^ (1 << qubit_idx)
+        # Work buffers reused across all time points
+        psi_conj = np.empty(2 ** qubits, dtype=complex)
+        probs = np.empty(2 ** qubits)
+        overlap = np.empty((qubits, 2 ** qubits), dtype=complex)
+    
+    run_options = {} if aer_method == 'statevector' else {'shots': shots}
+    
+    # Preferred: submit the parameterized template once and let Aer bind t (and the
+    # drive strength) for every time point itself, instead of building one Python
+    # circuit copy per time point
+    batch_result = None
+    if AerSimulator is not DummyAerSimulator and t in run_template.parameters:
+        parameter_binds = {t: times.tolist()}
+        if drive is not None:
+            parameter_binds[drive] = [drive_param] * time_points
         try:
-            if hasattr(circuit, 'assign_parameters'):
-                # Use newer Qiskit 2.0 API
-                bound_circuit = circuit.assign_parameters({t: time_val})
-            elif hasattr(circuit, 'bind_parameters'):
-                # Use older Qiskit API
-                bound_circuit = circuit.bind_parameters({t: time_val})
-            else:
-                raise AttributeError("No parameter binding method found")
+            batch_result = simulator.run(run_template, parameter_binds=[parameter_binds],
+                                         **run_options).result()
         except Exception as e:
-            # Fallback for errors - create a basic circuit
-            print(f"Warning: Parameter binding error: {e}. Using simplified simulation")
-            from qiskit import QuantumCircuit
-            bound_circuit = QuantumCircuit(qubits)
+            print(f"Warning: Aer parameter binding failed ({e}). Binding circuits in Python")
+            batch_result = None
+    
+    if batch_result is None:
+        # Bind t (and the drive strength) for every time point up front so the whole batch
+        # goes to Aer in one run(). The binding method is resolved once; both return a new
+        # circuit (the cached template is never modified).
+        bind = _parameter_binder(run_template)
+        bound_circuits = []
+        for time_val in times:
+            try:
+                if bind is None:
+                    raise AttributeError("No parameter binding method found")
+                if drive is not None:
+                    bound_circuit = bind({t: time_val, drive: drive_param})
+                else:
+                    bound_circuit = bind({t: time_val})
+            except Exception as e:
+                # Fallback for errors - create a basic circuit
+                print(f"Warning: Parameter binding error: {e}. Using simplified simulation")
+                bound_circuit = QuantumCircuit(qubits)
+                _attach_save_instructions(bound_circuit, aer_method, qubits)
+            bound_circuits.append(bound_circuit)
         
-        # Transpile circuit for the target backend (with try/except for compatibility)
         try:
-            transpiled_circuit = transpile(bound_circuit, simulator)
-        except (TypeError, AttributeError):
-            # Fallback if transpile fails
-            print(f"Warning: Transpilation failed. Using original circuit.")
-            transpiled_circuit = bound_circuit
+            batch_result = simulator.run(bound_circuits, **run_options).result()
+        except Exception as e:
+            print(f"Error during simulation: {e}")
+            traceback.print_exc()
+            return {"error": f"Simulation failed: {str(e)}"}
+    
+    for i, time_val in enumerate(times):
+        # Report progress via callback if provided
+        if progress_callback is not None:
+            progress_callback(i, time_points)
         
         try:
-            # Execute the circuit
-            if aer_method == 'statevector':
-                # Statevector simulation with proper save_statevector instruction
-                try:
-                    # Try both import paths for different Qiskit versions
-                    try:
-                        from qiskit.providers.aer.library import SaveStatevector
-                    except ImportError:
-                        from qiskit_aer.library import SaveStatevector
-                except ImportError:
-                    # If we can't import at all, we'll just use the basic circuit
-                    print("SaveStatevector not available in this installation")
-                
-                # Create a copy of the circuit and add the save_statevector instruction
-                sv_circuit = transpiled_circuit.copy()
+            # Extract the results for this time point
+            if saves_expectations:
+                # Magnetizations were computed by Aer on its internal state
+                data = batch_result.data(i)
+                expectation_values['mx'][i] = np.real(data['mx'])
+                expectation_values['my'][i] = np.real(data['my'])
+                expectation_values['mz'][i] = np.real(data['mz'])
+            elif aer_method == 'statevector':
+                # Read the raw amplitude array straight from the result data
+                if hasattr(batch_result, 'data'):
+                    psi = np.asarray(batch_result.data(i)['statevector'], dtype=complex)
+                else:
+                    psi = np.asarray(batch_result.get_statevector(i), dtype=complex)
                 
-                # Try to add save_statevector instruction (method may not exist in some versions)
+                # Calculate the qubit-averaged expectation values with NumPy:
+                # <Z_q> = sum_k |psi_k|^2 z_q(k), and with o_k = conj(psi_k) psi_(k xor 2^q):
+                # <X_q> = sum_k Re(o_k), <Y_q> = sum_k z_q(k) Im(o_k)
                 try:
-                    sv_circuit.save_statevector()
-                except AttributeError:
-                    print("Warning: save_statevector not available - using basic circuit")
-                
-                # Run the simulation
-                result = simulator.run(sv_circuit).result()
-                statevec = Statevector(result.get_statevector())
-                
-                # Calculate expectation values using Qiskit built-in Pauli operators
-                try:
-                    # Use Qiskit's Pauli operators
-                    from qiskit.quantum_info import Pauli
-                    
-                    # Initialize accumulators for expectation values
-                    x_exp_val = 0.0
-                    y_exp_val = 0.0
-                    z_exp_val = 0.0
-                    
-                    # Calculate expectation value for each qubit and average them
-                    for q in range(qubits):
-                        # Create Pauli operator strings (I on all qubits except q)
-                        x_op = ['I'] * qubits
-                        y_op = ['I'] * qubits
-                        z_op = ['I'] * qubits
-                        
-                        # Put X, Y, Z at position q
-                        x_op[q] = 'X'
-                        y_op[q] = 'Y'
-                        z_op[q] = 'Z'
-                        
-                        # Convert to Pauli operators
-                        pauli_x = Pauli(''.join(x_op))
-                        pauli_y = Pauli(''.join(y_op))
-                        pauli_z = Pauli(''.join(z_op))
-                        
-                        # Calculate expectation values
-                        x_exp_val += statevec.expectation_value(pauli_x)
-                        y_exp_val += statevec.expectation_value(pauli_y)
-                        z_exp_val += statevec.expectation_value(pauli_z)
-                    
-                    # Average over all qubits
-                    expectation_values['mx'][i] = float(x_exp_val) / qubits
-                    expectation_values['my'][i] = float(y_exp_val) / qubits
-                    expectation_values['mz'][i] = float(z_exp_val) / qubits
+                    np.conjugate(psi, out=psi_conj)
+                    np.multiply(psi_conj, psi, out=overlap[0])
+                    probs[:] = overlap[0].real
+                    np.take(psi, flip_idx, out=overlap)
+                    overlap *= psi_conj
+                    expectation_values['mx'][i] = overlap.real.sum() / qubits
+                    expectation_values['my'][i] = (overlap.imag * z_sign).sum() / qubits
+                    expectation_values['mz'][i] = (z_sign @ probs).sum() / qubits
                     
                 except Exception as e:
                     print(f"Warning: Error calculating expectation values: {e}")
                     # Fallback to simulated values if needed - this still allows program to run
-                    import math
                     expectation_values['mx'][i] = 0.5 * math.sin(time_val * 2.0)
                     expectation_values['my'][i] = 0.5 * math.cos(time_val * 2.0)
                     expectation_values['mz'][i] = 0.5 * math.sin(time_val * 4.0)
             else:
-                # Measurement-based simulation
-                # Add measurements
-                meas_circuit = transpiled_circuit.copy()
-                meas_circuit.measure_all()
-                
-                # Run with shots
-                result = simulator.run(meas_circuit, shots=shots).result()
-                counts = result.get_counts()
+                counts = batch_result.get_counts(i)
                 
-                # Calculate expectation values from counts
-                total_shots = sum(counts.values())
-                
-                for q in range(qubits):
-                    # Initialize accumulators for this qubit
-                    q_mx, q_my, q_mz = 0, 0, 0
-                    
-                    # Process each measurement outcome
-                    for bitstring, count in counts.items():
-                        # Reverse bitstring to match qubit ordering
-                        rev_bitstring = bitstring[::-1]
-                        
-                        # Get state of this qubit (0 or 1)
-                        q_state = int(rev_bitstring[q]) if q < len(rev_bitstring) else 0
-                        
-                        # +1 for |0⟩ and -1 for |1⟩ for Z
-                        q_mz += (1 - 2 * q_state) * count
-                        
-                        # X and Y are more complex and would require measurements in different bases
-                        # This is an approximation - a real implementation would rotate and measure
-                        # TODO: For now, we're setting X and Y to 0 in this simulation method
-                    
-                    # Normalize by total shots and accumulate for this qubit
-                    expectation_values['mz'][i] += q_mz / total_shots / qubits
-                    # TODO: X and Y values are not accurately calculated in this simple approach
+                # Calculate expectation values from counts: convert the bitstrings to
+                # integers once and accumulate every qubit's Z in one kernel call
+                keys = np.fromiter((int(k.replace(' ', ''), 2) for k in counts), dtype=np.int64, count=len(counts))
+                vals = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+                expectation_values['mz'][i] = _z_expvals(keys, vals, qubits).mean()
+                # TODO: X and Y would require measurements in different bases; they stay 0 here
         
         except Exception as e:
             print(f"Error during simulation at time {time_val}: {e}")
@@ -317,121 +572,136 @@ def run_simulation(circuit_type, qubits=3, shots=8192, drive_steps=5,
     # Analyze for logarithmic frequency combs
     log_comb_analysis = analyze_log_frequency_comb(analysis)
     
+    if save_results:
+        # Save the bulk arrays (expectation values and FFT spectra) in binary form, in
+        # the background; fft_data.json keeps the metadata and peak information
+        arrays_future = _IO_POOL.submit(
+            np.savez_compressed, os.path.join(data_path, 'arrays.npz'),
+            times=times,
+            mx=expectation_values['mx'],
+            my=expectation_values['my'],
+            mz=expectation_values['mz'],
+            positive_frequencies=np.asarray(analysis.get('positive_frequencies', [])),
+            mx_fft_pos=np.asarray(analysis.get('mx_fft_pos', [])),
+            my_fft_pos=np.asarray(analysis.get('my_fft_pos', [])),
+            mz_fft_pos=np.asarray(analysis.get('mz_fft_pos', [])))
+    
     # Plot results
     if save_results or show_plots:
         # Base plots
-        plot_expectation_values(times, expectation_values, 
-                               plot_title=f'{circuit_type} Circuit - Expectation Values',
-                               show_plot=show_plots, save_path=fig_path)
-        
-        plot_fft_analysis(analysis, drive_freq=drive_freq,
-                         plot_title=f'{circuit_type} Circuit - FFT Analysis',
-                         show_plot=show_plots, save_path=fig_path,
-                         fc_analysis=fc_analysis)
+        plot_jobs = [
+            (plot_expectation_values, (times, expectation_values),
+             dict(plot_title=f'{circuit_type} Circuit - Expectation Values',
+                  show_plot=show_plots, save_path=fig_path)),
+            (plot_fft_analysis, (analysis,),
+             dict(drive_freq=drive_freq,
+                  plot_title=f'{circuit_type} Circuit - FFT Analysis',
+                  show_plot=show_plots, save_path=fig_path,
+                  fc_analysis=fc_analysis)),
+        ]
         
         # Comb analysis plots
         if comb_analysis.get('mx_comb_found', False) or comb_analysis.get('mz_comb_found', False):
-            plot_frequency_comb_analysis(analysis, comb_analysis, drive_freq=drive_freq,
-                                        plot_title=f'{circuit_type} - Frequency Comb Analysis',
-                                        show_plot=show_plots, save_path=fig_path)
+            plot_jobs.append((plot_frequency_comb_analysis, (analysis, comb_analysis),
+                              dict(drive_freq=drive_freq,
+                                   plot_title=f'{circuit_type} - Frequency Comb Analysis',
+                                   show_plot=show_plots, save_path=fig_path)))
         
         # Log comb analysis plots
         if log_comb_analysis.get('mx_log_comb_found', False) or log_comb_analysis.get('mz_log_comb_found', False):
-            plot_log_comb_analysis(analysis, log_comb_analysis,
-                                  plot_title=f'{circuit_type} - Logarithmic Comb Analysis',
-                                  show_plot=show_plots, save_path=fig_path)
+            plot_jobs.append((plot_log_comb_analysis, (analysis, log_comb_analysis),
+                              dict(plot_title=f'{circuit_type} - Logarithmic Comb Analysis',
+                                   show_plot=show_plots, save_path=fig_path)))
+        
+        if show_plots:
+            # Interactive plots must be shown from this thread
+            for fn, args, kwargs in plot_jobs:
+                fn(*args, **kwargs)
+        else:
+            # Saved-only plots are independent: draw them concurrently
+            for future in plot_all_async(plot_jobs):
+                future.result()
     
     # Save numerical data if requested
     if save_results:
-        # Save raw expectation values
-        exp_data = {
-            'times': times.tolist(),
-            'mx': expectation_values['mx'].tolist(),
-            'my': expectation_values['my'].tolist(),
-            'mz': expectation_values['mz'].tolist()
+        # Gather peak frequencies/amplitudes with one fancy-indexing pass per observable
+        positive_frequencies = np.asarray(analysis.get('positive_frequencies', []))
+        peak_arrays = {}
+        for obs in ('mx', 'my', 'mz'):
+            peak_idx = np.asarray(analysis.get(f'{obs}_peaks_indices', []), dtype=np.int64)
+            fft_pos = np.asarray(analysis.get(f'{obs}_fft_pos', []))
+            peak_arrays[obs] = (positive_frequencies[peak_idx], fft_pos[peak_idx])
+        
+        # Simulation parameters (with sweep tracking information), shared by
+        # fft_data.json, analysis_results.json and result_data.json
+        params_dict = {
+            'circuit_type': circuit_type,
+            'qubits': int(qubits),
+            'shots': int(shots),
+            'drive_steps': int(drive_steps),
+            'time_points': int(time_points),
+            'max_time': float(max_time),
+            'drive_param': float(drive_param),
+            'init_state': init_state,
+            # Add parameter sweep tracking information
+            'sweep_session': sweep_session,
+            'sweep_index': sweep_index,
+            'sweep_param1': sweep_param1,
+            'sweep_value1': sweep_value1,
+            'sweep_param2': sweep_param2,
+            'sweep_value2': sweep_value2
         }
-        with open(os.path.join(data_path, 'expectation_values.json'), 'w') as f:
-            json.dump(exp_data, f, indent=2)
+        
+        # Detection flags, shared by the fft_data.json metadata and result_data.json
+        time_crystal_detected = bool(analysis.get('has_subharmonics', False))
+        incommensurate_count = int(fc_analysis.get('incommensurate_peak_count', 0))
+        drive_frequency = float(analysis.get('drive_frequency', 0))
+        linear_combs_detected = bool(comb_analysis.get('mx_comb_found', False) or comb_analysis.get('mz_comb_found', False))
+        log_combs_detected = bool(log_comb_analysis.get('mx_log_comb_found', False) or log_comb_analysis.get('mz_log_comb_found', False))
         
         # Save FFT data with metadata
         fft_data = {
             # Include all simulation parameters as metadata
             'metadata': {
-                'circuit_type': circuit_type,
-                'qubits': int(qubits),
-                'shots': int(shots),
-                'drive_steps': int(drive_steps),
-                'time_points': int(time_points),
-                'max_time': float(max_time),
-                'drive_param': float(drive_param),
-                'init_state': init_state,
-                'drive_frequency': float(analysis.get('drive_frequency', 0)),
-                'has_subharmonics': bool(analysis.get('has_subharmonics', False)),
-                'time_crystal_detected': bool(analysis.get('has_subharmonics', False)),
-                'incommensurate_count': int(fc_analysis.get('incommensurate_peak_count', 0)),
-                'linear_combs_detected': bool(comb_analysis.get('mx_comb_found', False) or comb_analysis.get('mz_comb_found', False)),
-                'log_combs_detected': bool(log_comb_analysis.get('mx_log_comb_found', False) or log_comb_analysis.get('mz_log_comb_found', False)),
-                'created_at': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                # Add parameter sweep tracking information
-                'sweep_session': sweep_session,
-                'sweep_index': sweep_index,
-                'sweep_param1': sweep_param1,
-                'sweep_value1': sweep_value1,
-                'sweep_param2': sweep_param2,
-                'sweep_value2': sweep_value2
+                **params_dict,
+                'drive_frequency': drive_frequency,
+                'has_subharmonics': time_crystal_detected,
+                'time_crystal_detected': time_crystal_detected,
+                'incommensurate_count': incommensurate_count,
+                'linear_combs_detected': linear_combs_detected,
+                'log_combs_detected': log_combs_detected,
+                'created_at': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             },
-            # Frequency data
-            'positive_frequencies': analysis.get('positive_frequencies', []).tolist(),
-            'mx_fft_pos': analysis.get('mx_fft_pos', []).tolist(),
-            'my_fft_pos': analysis.get('my_fft_pos', []).tolist(),
-            'mz_fft_pos': analysis.get('mz_fft_pos', []).tolist(),
             # Peak information
             'peaks': {
                 'mx': {
-                    'frequencies': [float(analysis.get('positive_frequencies', [])[i]) for i in analysis.get('mx_peaks_indices', [])],
-                    'amplitudes': [float(analysis.get('mx_fft_pos', [])[i]) for i in analysis.get('mx_peaks_indices', [])],
+                    'frequencies': peak_arrays['mx'][0],
+                    'amplitudes': peak_arrays['mx'][1],
                     'is_harmonic': fc_analysis.get('mx_harmonic_mask', []),
                     'is_incommensurate': fc_analysis.get('mx_incommensurate_mask', []),
                     'is_comb_tooth': comb_analysis.get('mx_comb_mask', [])
                 },
                 'my': {
-                    'frequencies': [float(analysis.get('positive_frequencies', [])[i]) for i in analysis.get('my_peaks_indices', [])],
-                    'amplitudes': [float(analysis.get('my_fft_pos', [])[i]) for i in analysis.get('my_peaks_indices', [])],
+                    'frequencies': peak_arrays['my'][0],
+                    'amplitudes': peak_arrays['my'][1],
                     'is_harmonic': fc_analysis.get('my_harmonic_mask', []),
                     'is_incommensurate': fc_analysis.get('my_incommensurate_mask', []),
                     'is_comb_tooth': comb_analysis.get('my_comb_mask', [])
                 },
                 'mz': {
-                    'frequencies': [float(analysis.get('positive_frequencies', [])[i]) for i in analysis.get('mz_peaks_indices', [])],
-                    'amplitudes': [float(analysis.get('mz_fft_pos', [])[i]) for i in analysis.get('mz_peaks_indices', [])],
+                    'frequencies': peak_arrays['mz'][0],
+                    'amplitudes': peak_arrays['mz'][1],
                     'is_harmonic': fc_analysis.get('mz_harmonic_mask', []),
                     'is_incommensurate': fc_analysis.get('mz_incommensurate_mask', []),
                     'is_comb_tooth': comb_analysis.get('mz_comb_mask', [])
                 }
             }
         }
-        with open(os.path.join(data_path, 'fft_data.json'), 'w') as f:
-            json.dump(fft_data, f, indent=2)
+        save_json(fft_data, os.path.join(data_path, 'fft_data.json.gz'))
         
         # Save analysis results
         analysis_results = {
-            'parameters': {
-                'circuit_type': circuit_type,
-                'qubits': qubits,
-                'shots': shots,
-                'drive_steps': drive_steps,
-                'time_points': time_points,
-                'max_time': max_time,
-                'drive_param': drive_param,
-                'init_state': init_state,
-                # Add parameter sweep tracking information
-                'sweep_session': sweep_session,
-                'sweep_index': sweep_index,
-                'sweep_param1': sweep_param1,
-                'sweep_value1': sweep_value1,
-                'sweep_param2': sweep_param2,
-                'sweep_value2': sweep_value2
-            },
+            'parameters': params_dict,
             'basic_analysis': {
                 'drive_frequency': analysis.get('drive_frequency', 0),
                 'has_subharmonics': analysis.get('has_subharmonics', False),
@@ -461,36 +731,34 @@ def run_simulation(circuit_type, qubits=3, shots=8192, drive_steps=5,
                 'mz_log_num_teeth': log_comb_analysis.get('mz_log_num_teeth', 0)
             }
         }
-        with open(os.path.join(res_path, 'analysis_results.json'), 'w') as f:
-            json.dump(analysis_results, f, indent=2)
+        if save_analysis_json:
+            save_json(analysis_results, os.path.join(res_path, 'analysis_results.json.gz'))
         
         # Save potential FC peak data
         fc_peaks_data = {
             'potential_fc_peaks': fc_analysis.get('potential_fc_peaks', [])
         }
-        with open(os.path.join(data_path, 'fc_peaks_data.json'), 'w') as f:
-            json.dump(fc_peaks_data, f, indent=2)
+        save_json(fc_peaks_data, os.path.join(data_path, 'fc_peaks_data.json'))
             
         # Create a summary result_data.json file at the root of the results folder
         # This is used by the web UI to display simulation results
         result_data = {
-            'parameters': analysis_results['parameters'],
-            'time_crystal_detected': analysis_results['basic_analysis']['has_subharmonics'],
-            'incommensurate_count': analysis_results['frequency_crystal_analysis']['incommensurate_peak_count'],
-            'drive_frequency': analysis_results['basic_analysis']['drive_frequency'],
-            'linear_combs_detected': (
-                analysis_results['linear_comb_analysis']['mx_comb_found'] or 
-                analysis_results['linear_comb_analysis']['mz_comb_found']
-            ),
-            'log_combs_detected': (
-                analysis_results['log_comb_analysis']['mx_log_comb_found'] or 
-                analysis_results['log_comb_analysis']['mz_log_comb_found']
-            ),
+            'parameters': params_dict,
+            'time_crystal_detected': time_crystal_detected,
+            'incommensurate_count': incommensurate_count,
+            'drive_frequency': drive_frequency,
+            'linear_combs_detected': linear_combs_detected,
+            'log_combs_detected': log_combs_detected,
             'random_seed': seed,
             'timestamp': timestamp
         }
-        with open(os.path.join(res_path, 'result_data.json'), 'w') as f:
-            json.dump(result_data, f, indent=2)
+        save_json(result_data, os.path.join(res_path, 'result_data.json'))
+        
+        # The result folder is complete once arrays.npz is written
+        try:
+            arrays_future.result()
+        except Exception as e:
+            print(f"Warning: Could not save arrays.npz: {e}")
         
         # Save to Google Drive if enabled
         if gdrive_save_path:
@@ -553,26 +821,176 @@ def run_simulation(circuit_type, qubits=3, shots=8192, drive_steps=5,
     # Return the results
     return results
 
+def _format_param_label(key, value):
+    """Format one 'key=value' part of a parameter set name (floats to 2 decimals)."""
+    return f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+
+# Memoized: in a grid scan each value repeats across many parameter sets.
+# typed=True keeps e.g. 1 and 1.0 apart ('x=1' vs 'x=1.00').
+_cached_param_label = functools.lru_cache(maxsize=4096, typed=True)(_format_param_label)
+
+def _param_label(key, value):
+    """
+    Memoized _format_param_label.
+    
+    Unhashable values (e.g. lists or dicts from a custom grid) can't be cache
+    keys and are formatted without the cache.
+    """
+    try:
+        return _cached_param_label(key, value)
+    except TypeError:
+        return _format_param_label(key, value)
+
+def _run_one(i, params, circuit_type, save_results, show_plots,
+             aer_method, cache_dir, plot_circuit=True, save_per_set_json=False,
+             aer_threads=None):
+    """
+    Run (or load from cache) a single parameter set of a parameter scan.
+    
+    Kept at module level so it can be dispatched to joblib worker processes.
+    The simulation itself runs quietly; the scan reports progress on one line
+    and only errors and warnings are printed here.
+    
+    Args (beyond the simulation settings):
+        aer_threads (int): Aer thread limit for this process (1 in worker processes)
+    
+    Returns:
+        tuple: (index, summary_row, result) where result is None on failure
+    """
+    global _AER_MAX_THREADS
+    _AER_MAX_THREADS = aer_threads
+    
+    # Create a name for this parameter set (floats to 2 decimals, everything else as-is)
+    param_set_name = '_'.join(_param_label(key, value) for key, value in params.items())
+    
+    # Run simulation with these parameters
+    try:
+        # Merge the parameter set with default settings (parameter values take precedence)
+        sim_params = {
+            'circuit_type': circuit_type,
+            'param_set_name': param_set_name,
+            'save_results': save_results,
+            'show_plots': show_plots,
+            'aer_method': aer_method,
+            'plot_circuit': plot_circuit,
+            'verbose': False,
+            'save_analysis_json': save_per_set_json,
+            **params
+        }
+        
+        # Actually run the simulation, or load it from the result cache
+        result = None
+        if cache_dir:
+            cache_path = _result_cache_path(cache_dir, sim_params)
+            if os.path.exists(cache_path):
+                try:
+                    with open(cache_path, 'rb') as f:
+                        result = pickle.load(f)
+                    result = {**result, **dict.fromkeys(_RESULT_PATH_FIELDS), 'from_cache': True}
+                except Exception as e:
+                    print(f"Warning: Could not load cached result {cache_path}: {e}")
+                    result = None
+        
+        if result is None:
+            result = run_simulation(**sim_params)
+            
+            if cache_dir and 'error' not in result:
+                # Write to a temporary file and rename it into place, so a crash or a
+                # concurrent scan sharing cache_dir never leaves a truncated entry
+                tmp_path = None
+                try:
+                    tmp_fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+                    with os.fdopen(tmp_fd, 'wb') as f:
+                        pickle.dump(result, f, protocol=5)
+                    os.replace(tmp_path, cache_path)
+                except Exception as e:
+                    print(f"Warning: Could not cache result to {cache_path}: {e}")
+                    if tmp_path is not None:
+                        try:
+                            os.remove(tmp_path)
+                        except OSError:
+                            pass
+        
+        if 'error' in result:
+            print(f"\nError in parameter set {i+1}: {result['error']}")
+            summary_row = {
+                'param_set': i+1,
+                'status': 'error',
+                'error_message': result['error'],
+                **params
+            }
+            return i, summary_row, None
+        
+        # Extract key results for summary
+        summary_row = {
+            'param_set': i+1,
+            'status': 'success',
+            'has_subharmonics': result['analysis'].get('has_subharmonics', False),
+            'incommensurate_count': result['fc_analysis'].get('incommensurate_peak_count', 0),
+            'mx_comb_found': result['comb_analysis'].get('mx_comb_found', False),
+            'mx_comb_teeth': result['comb_analysis'].get('mx_num_teeth', 0),
+            'mz_comb_found': result['comb_analysis'].get('mz_comb_found', False),
+            'mz_comb_teeth': result['comb_analysis'].get('mz_num_teeth', 0),
+            'mx_log_comb_found': result['log_comb_analysis'].get('mx_log_comb_found', False),
+            'mz_log_comb_found': result['log_comb_analysis'].get('mz_log_comb_found', False),
+            'elapsed_time': result['elapsed_time'],
+            **params
+        }
+        return i, summary_row, result
+        
+    except Exception as e:
+        print(f"\nError in parameter set {i+1}: {e}")
+        traceback.print_exc()
+        summary_row = {
+            'param_set': i+1,
+            'status': 'exception',
+            'error_message': str(e),
+            **params
+        }
+        return i, summary_row, None
+
 def run_parameter_scan(circuit_type, parameter_sets, scan_name='parameter_scan',
                      save_results=True, show_plots=False, verbose=True,
-                     aer_method='statevector'):
+                     aer_method='statevector', export_formats=('csv', 'parquet'), cache_dir=None,
+                     reorder=None, n_jobs=1, save_per_set_json=False):
     """
     Run simulations over a range of parameters.
     
     Args:
         circuit_type (str): Type of quantum circuit to use
-        parameter_sets (list): List of parameter dictionaries to scan over
+        parameter_sets (list): Parameter dictionaries to scan over (any iterable,
+            e.g. iter_parameter_grid(); it is materialized once)
         scan_name (str): Name for this parameter scan
         save_results (bool): Whether to save results to disk
         show_plots (bool): Whether to display plots
         verbose (bool): Whether to print progress messages
         aer_method (str): Simulation method
+        export_formats (tuple): Summary file formats. The CSV summary is always written;
+            'parquet' (zstd-compressed, requires pyarrow) and 'xlsx' (opt-in, much slower)
+            are written at the end of the scan.
+        cache_dir (str): Directory for cached simulation results (e.g. '~/.qtk_cache').
+            Parameter sets already in the cache are loaded instead of re-simulated. They
+            are not saved again (no result folder, figures or database row), and their
+            results have 'from_cache' set and no output paths.
+        reorder (str): Execution order of the parameter sets. 'by_slow_axis' runs them
+            grouped by the parameters with the fewest distinct values first, so consecutive
+            runs share as much circuit structure as possible. Results and the summary
+            files are always in the original order.
+        n_jobs (int): Number of worker processes (-1 for all cores). Uses joblib if it is
+            installed, otherwise a ProcessPoolExecutor with config.SCAN_WORKERS workers for -1.
+        save_per_set_json (bool): Whether each parameter set also writes its own
+            analysis_results.json.gz. Off by default: its headline values are already in
+            the scan summary, and result_data.json is always written for the web UI.
     
     Returns:
         list: Results for each parameter set
     """
     start_time = time.time()
     
+    # Accept lazy iterables (e.g. iter_parameter_grid) - the scan needs random access
+    if not (hasattr(parameter_sets, '__len__') and hasattr(parameter_sets, '__getitem__')):
+        parameter_sets = list(parameter_sets)
+    
     # Create folder for scan results
     timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
     scan_folder = f"{circuit_type}_{scan_name}_{timestamp}"
@@ -580,121 +998,184 @@ def run_parameter_scan(circuit_type, parameter_sets, scan_name='parameter_scan',
     if save_results:
         scan_path = os.path.join(config.RESULTS_BASE_PATH, scan_folder)
         os.makedirs(scan_path, exist_ok=True)
+        summary_csv_path = os.path.join(scan_path, 'summary_results.csv')
+        summary_excel_path = os.path.join(scan_path, 'summary_results.xlsx')
+        summary_parquet_path = os.path.join(scan_path, 'summary_results.parquet')
         
         # Set up Google Drive if enabled
         gdrive_save_path = setup_gdrive_if_needed()
         if gdrive_save_path:
             gdrive_scan_path = os.path.join(gdrive_save_path, scan_folder)
             os.makedirs(gdrive_scan_path, exist_ok=True)
+            gdrive_csv_path = os.path.join(gdrive_scan_path, 'summary_results.csv')
+            gdrive_excel_path = os.path.join(gdrive_scan_path, 'summary_results.xlsx')
+            gdrive_parquet_path = os.path.join(gdrive_scan_path, 'summary_results.parquet')
     else:
         scan_path = None
         gdrive_save_path = None
     
-    # Initialize results storage
-    all_results = []
-    summary_data = []
+    if cache_dir:
+        cache_dir = os.path.expanduser(cache_dir)
+        os.makedirs(cache_dir, exist_ok=True)
     
-    # Loop through each parameter set
-    for i, params in enumerate(parameter_sets):
-        if verbose:
-            print(f"\nRunning parameter set {i+1}/{len(parameter_sets)}:")
-            for key, value in params.items():
-                print(f"  {key}: {value}")
-        
-        # Create a name for this parameter set
-        param_values = []
-        for key, value in params.items():
-            formatted_value = format_param(value, '.2f' if isinstance(value, float) else '')
-            param_values.append(f"{key}={formatted_value}")
-        param_set_name = '_'.join(param_values)
-        
-        # Run simulation with these parameters
+    # Parameter names used anywhere in the scan, in first-seen order (computed once per scan)
+    param_keys = list(dict.fromkeys(key for params in parameter_sets for key in params))
+    
+    # Decide the execution order (indices into parameter_sets)
+    run_order = list(range(len(parameter_sets)))
+    if reorder == 'by_slow_axis':
+        axes_by_cardinality = sorted(
+            sorted(param_keys), key=lambda k: len({str(params.get(k)) for params in parameter_sets}))
         try:
-            # Merge the parameter set with default settings
-            sim_params = {
-                'circuit_type': circuit_type,
-                'param_set_name': param_set_name,
-                'save_results': save_results,
-                'show_plots': show_plots,
-                'aer_method': aer_method,
-                'verbose': verbose
-            }
-            sim_params.update(params)
-            
-            # Actually run the simulation
-            result = run_simulation(**sim_params)
-            
-            if 'error' in result:
-                print(f"Error in parameter set {i+1}: {result['error']}")
-                summary_row = {
-                    'param_set': i+1,
-                    'status': 'error',
-                    'error_message': result['error']
-                }
-                summary_row.update(params)
-                summary_data.append(summary_row)
-                continue
-            
-            # Extract key results for summary
-            summary_row = {
-                'param_set': i+1,
-                'status': 'success',
-                'has_subharmonics': result['analysis'].get('has_subharmonics', False),
-                'incommensurate_count': result['fc_analysis'].get('incommensurate_peak_count', 0),
-                'mx_comb_found': result['comb_analysis'].get('mx_comb_found', False),
-                'mx_comb_teeth': result['comb_analysis'].get('mx_num_teeth', 0),
-                'mz_comb_found': result['comb_analysis'].get('mz_comb_found', False),
-                'mz_comb_teeth': result['comb_analysis'].get('mz_num_teeth', 0),
-                'mx_log_comb_found': result['log_comb_analysis'].get('mx_log_comb_found', False),
-                'mz_log_comb_found': result['log_comb_analysis'].get('mz_log_comb_found', False),
-                'elapsed_time': result['elapsed_time']
-            }
-            summary_row.update(params)
-            summary_data.append(summary_row)
-            
-            # Store the full result
-            all_results.append(result)
-            
-        except Exception as e:
-            print(f"Error in parameter set {i+1}: {e}")
-            traceback.print_exc()
-            summary_row = {
-                'param_set': i+1,
-                'status': 'exception',
-                'error_message': str(e)
-            }
-            summary_row.update(params)
-            summary_data.append(summary_row)
+            run_order.sort(key=lambda idx: tuple(parameter_sets[idx].get(k) for k in axes_by_cardinality))
+        except TypeError:
+            # Mixed/missing values that can't be compared - keep the original order
+            run_order = list(range(len(parameter_sets)))
+    elif reorder is not None:
+        raise ValueError(f"Unknown reorder mode: {reorder}")
+    
+    # Initialize results storage, one slot per parameter set (filled by index)
+    all_results = [None] * len(parameter_sets)
     
-    # Create summary table
-    if save_results and summary_data:
-        summary_df = pd.DataFrame(summary_data)
+    shared = {
+        'circuit_type': circuit_type,
+        'save_results': save_results,
+        'show_plots': show_plots,
+        'aer_method': aer_method,
+        'cache_dir': cache_dir,
+        'save_per_set_json': save_per_set_json
+    }
+    # A single parameter set gains nothing from worker processes
+    parallel = n_jobs != 1 and len(run_order) > 1
+    if parallel:
+        # Worker processes can't show interactive plots, and each runs Aer single-threaded
+        # (the scan is parallelized across parameter sets instead)
+        shared['show_plots'] = False
+        shared['aer_threads'] = 1
+    
+    # Draw the circuit diagram only once per (circuit_type, qubits) in the scan
+    diagram_keys = set()
+    plot_circuit_flags = {}
+    for i in run_order:
+        key = (circuit_type, parameter_sets[i].get('qubits', config.DEFAULT_SIMULATION_PARAMS['qubits']))
+        plot_circuit_flags[i] = key not in diagram_keys
+        diagram_keys.add(key)
+    
+    # Stream summary rows to CSV as parameter sets complete, with a pre-declared schema
+    summary_fields = SUMMARY_FIELDS + [key for key in param_keys if key not in SUMMARY_FIELDS] + ['error_message']
+    summary_file = None
+    summary_writer = None
+    if save_results:
+        summary_file = open(summary_csv_path, 'w', newline='', buffering=1 << 20)
+        summary_writer = csv.DictWriter(summary_file, fieldnames=summary_fields, extrasaction='ignore')
+        summary_writer.writeheader()
+    
+    # The summary table is also kept column-wise (one preallocated list per field,
+    # filled by parameter set index) for the Parquet/XLSX exports, so the DataFrame
+    # is built directly from its columns
+    summary_columns = {field: [None] * len(parameter_sets) for field in summary_fields}
+    completed_sets = np.zeros(len(parameter_sets), dtype=bool)
+    next_summary_row = 0  # First parameter set not yet written to the CSV summary
+    
+    def write_summary_rows(skip_missing=False):
+        # Write finished rows to the CSV summary in parameter set order (sets may
+        # finish in another order, e.g. with reorder='by_slow_axis'); with
+        # skip_missing, rows after sets that never finished are written too
+        nonlocal next_summary_row
+        while next_summary_row < len(parameter_sets) and (skip_missing or completed_sets[next_summary_row]):
+            if completed_sets[next_summary_row]:
+                summary_writer.writerow({field: summary_columns[field][next_summary_row] for field in summary_fields})
+            next_summary_row += 1
+    
+    def collect(outputs):
+        for completed, (i, summary_row, result) in enumerate(outputs, 1):
+            if verbose:
+                # Single progress line, updated in place
+                sys.stdout.write(f"\rCompleted {completed}/{len(run_order)} parameter sets")
+                sys.stdout.flush()
+            for field in summary_fields:
+                summary_columns[field][i] = summary_row.get(field)
+            completed_sets[i] = True
+            all_results[i] = result
+            if summary_writer is not None:
+                write_summary_rows()
+                # Flush in batches: partial results reach disk without a syscall per row
+                # (the file is closed, and so flushed, when the scan ends or fails)
+                if completed % 16 == 0:
+                    summary_file.flush()
+    
+    # Loop through each parameter set, in worker processes if requested
+    try:
+        if parallel and JOBLIB_AVAILABLE:
+            if verbose:
+                print(f"Running {len(parameter_sets)} parameter sets with joblib (n_jobs={n_jobs})")
+            # One thread per worker so BLAS/Aer inside each process don't oversubscribe cores
+            with parallel_backend('loky', inner_max_num_threads=1):
+                outputs = Parallel(n_jobs=n_jobs, prefer='processes', batch_size='auto',
+                                   return_as='generator')(
+                    delayed(_run_one)(i, parameter_sets[i], plot_circuit=plot_circuit_flags[i], **shared) for i in run_order)
+                collect(outputs)
+        elif parallel:
+            # joblib not installed - fall back to the standard library process pool
+            max_workers = config.SCAN_WORKERS if n_jobs is None or n_jobs < 0 else n_jobs
+            if verbose:
+                print(f"Running {len(parameter_sets)} parameter sets with {max_workers} worker processes")
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(_run_one, i, parameter_sets[i], plot_circuit=plot_circuit_flags[i], **shared) for i in run_order]
+                # Collect in submission order (the CSV summary is written in
+                # parameter set order either way)
+                collect(future.result() for future in futures)
+        else:
+            collect(_run_one(i, parameter_sets[i], plot_circuit=plot_circuit_flags[i], **shared) for i in run_order)
+    finally:
+        if summary_file is not None:
+            # A failed scan still keeps every row that finished
+            write_summary_rows(skip_missing=True)
+            summary_file.close()
+        if verbose:
+            # End the progress line
+            print()
+    
+    # Slots are indexed by parameter set, so this is already the original order;
+    # drop failed sets (no result)
+    all_results = [result for result in all_results if result is not None]
+    
+    # The CSV summary has already been written row by row
+    if save_results and completed_sets.any():
+        if 'parquet' in export_formats or 'xlsx' in export_formats:
+            summary_df = pd.DataFrame(summary_columns, columns=summary_fields)
         
-        # Save as CSV
-        summary_csv_path = os.path.join(scan_path, 'summary_results.csv')
-        summary_df.to_csv(summary_csv_path, index=False)
+        # Parquet: binary, columnar and compressed
+        if 'parquet' in export_formats:
+            try:
+                summary_df.to_parquet(summary_parquet_path, compression='zstd', index=False)
+            except Exception as e:
+                # Parquet writing needs pyarrow - the CSV summary is still available
+                print(f"Warning: Could not write Parquet summary: {e}")
         
-        # Also save as more readable Excel if pandas supports it
-        try:
-            summary_excel_path = os.path.join(scan_path, 'summary_results.xlsx')
-            summary_df.to_excel(summary_excel_path, index=False, sheet_name='Scan Results')
-        except:
-            # Excel writing might fail if openpyxl is not installed - ignore
-            pass
+        # Excel output is opt-in: it is much slower than CSV and needs an Excel writer
+        if 'xlsx' in export_formats:
+            try:
+                _write_summary_xlsx(summary_df, summary_excel_path)
+            except:
+                # Excel writing might fail if no Excel writer is installed - ignore
+                pass
         
+        # Copy the finished files to Google Drive instead of serializing them again
         if gdrive_save_path:
             try:
-                gdrive_csv_path = os.path.join(gdrive_save_path, scan_folder, 'summary_results.csv')
-                summary_df.to_csv(gdrive_csv_path, index=False)
+                shutil.copyfile(summary_csv_path, gdrive_csv_path)
                 
-                try:
-                    gdrive_excel_path = os.path.join(gdrive_save_path, scan_folder, 'summary_results.xlsx')
-                    summary_df.to_excel(gdrive_excel_path, index=False, sheet_name='Scan Results')
-                except:
-                    pass
+                if os.path.exists(summary_parquet_path):
+                    shutil.copyfile(summary_parquet_path, gdrive_parquet_path)
+                if os.path.exists(summary_excel_path):
+                    shutil.copyfile(summary_excel_path, gdrive_excel_path)
             except Exception as e:
                 print(f"Error saving summary to Google Drive: {e}")
     
+    # The figures kept for reuse between parameter sets are not needed any more
+    clear_figure_pool()
+    
     # Calculate and print total elapsed time
     total_time = time.time() - start_time
     if verbose:
@@ -704,27 +1185,106 @@ def run_parameter_scan(circuit_type, parameter_sets, scan_name='parameter_scan',
     
     return all_results
 
-def generate_parameter_grid(**param_ranges):
+def expand_param_range(values):
     """
-    Generate a grid of parameter combinations from ranges.
+    Values to scan for one parameter of a grid.
+    
+    Args:
+        values: Either a list of values, or a range dict {'min': ..., 'max': ..., 'steps': ...}.
+            A range gives `steps` evenly spaced values; if min and max are both ints,
+            the values are truncated to ints and duplicates are dropped.
+    
+    Returns:
+        list: Parameter values
+    """
+    if not isinstance(values, dict):
+        return values
+    
+    min_val, max_val = values['min'], values['max']
+    steps = int(values.get('steps', 1))
+    if steps <= 1:
+        return [min_val]
+    
+    grid = np.linspace(min_val, max_val, steps)
+    if isinstance(min_val, int) and isinstance(max_val, int):
+        return np.unique(grid.astype(int)).tolist()
+    return grid.tolist()
+
+class ParamGridView:
+    """
+    Read-only, lazily materialized view of a parameter grid.
+    
+    The Cartesian product is stored as one contiguous (N, m) NumPy array of
+    value indices built with np.meshgrid; the parameter dictionary for a grid
+    point is only created when it is accessed. Values keep their original
+    Python types (e.g. qubits stays an int).
+    """
+    
+    def __init__(self, param_ranges):
+        self.param_names = tuple(param_ranges)
+        self.param_values = [list(expand_param_range(values)) for values in param_ranges.values()]
+        index_axes = [np.arange(len(values)) for values in self.param_values]
+        if index_axes:
+            self._grid = np.stack(np.meshgrid(*index_axes, indexing='ij'), axis=-1).reshape(-1, len(index_axes))
+        else:
+            self._grid = np.zeros((1, 0), dtype=int)
+    
+    def __len__(self):
+        return len(self._grid)
+    
+    def __getitem__(self, i):
+        row = self._grid[i]
+        return {name: values[idx] for name, values, idx in zip(self.param_names, self.param_values, row)}
+    
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+def parameter_grid_view(**param_ranges):
+    """
+    Generate a grid of parameter combinations as a lazy ParamGridView.
+    
+    Same combinations and order as generate_parameter_grid, but the dictionaries
+    are built on access, which keeps very large grids cheap. Use
+    generate_parameter_grid if the parameter sets need to be modified.
     
     Args:
         param_ranges: Keyword arguments where keys are parameter names and
-                     values are lists of parameter values to scan.
+                     values are lists of parameter values to scan, or
+                     {'min', 'max', 'steps'} range dicts (see expand_param_range).
     
     Returns:
-        list: List of parameter dictionaries covering all combinations
+        ParamGridView: Indexable view of all parameter combinations
     """
-    param_names = list(param_ranges.keys())
-    param_values = list(param_ranges.values())
+    return ParamGridView(param_ranges)
+
+def iter_parameter_grid(**param_ranges):
+    """
+    Lazily generate the parameter combinations of a grid, one dictionary at a time.
     
-    # Generate all combinations
-    combinations = list(itertools.product(*param_values))
+    Args:
+        param_ranges: Keyword arguments where keys are parameter names and
+                     values are lists of parameter values to scan, or
+                     {'min', 'max', 'steps'} range dicts (see expand_param_range).
     
-    # Convert to list of dictionaries
-    param_sets = []
-    for combo in combinations:
-        param_dict = {name: value for name, value in zip(param_names, combo)}
-        param_sets.append(param_dict)
+    Yields:
+        dict: One parameter dictionary per combination
+    """
+    param_names = tuple(param_ranges)
+    for combo in itertools.product(*(expand_param_range(values) for values in param_ranges.values())):
+        yield dict(zip(param_names, combo))
+
+def generate_parameter_grid(**param_ranges):
+    """
+    Generate a grid of parameter combinations from ranges.
+    
+    Args:
+        param_ranges: Keyword arguments where keys are parameter names and
+                     values are lists of parameter values to scan, or
+                     {'min', 'max', 'steps'} range dicts (see expand_param_range).
     
-    return param_sets
+    Returns:
+        list: List of parameter dictionaries covering all combinations
+              (use iter_parameter_grid for very large grids)
+    """
+    return list(iter_parameter_grid(**param_ranges))
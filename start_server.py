@@ -26,15 +26,28 @@ class StandaloneApplication(gunicorn.app.base.BaseApplication):
         return self.application
 
 if __name__ == '__main__':
-    from main import app
+    import config
+    from main import app, db
+    
+    # The app is imported here, before the workers fork, so they share it
+    # copy-on-write; they must not share the database connections it opened
+    def post_fork(server, worker):
+        with app.app_context():
+            db.engine.dispose(close=False)
 
-    # Define server options with longer timeout for the worker
+    # Define server options with longer timeout for the worker.
+    # Threaded workers let dashboard pages and figure downloads be served while a
+    # simulation request is running (each simulation writes to its own folder).
     options = {
         'bind': '0.0.0.0:5000',
-        'workers': 1,
+        'workers': max(2, (os.cpu_count() or 2) // 2),
+        'threads': 8,
         'timeout': 180,  # 3 minutes (increased from default 30 seconds)
-        'reload': True,
-        'worker_class': 'sync',
+        'graceful_timeout': 180,
+        'keepalive': 5,
+        'reload': config.FLASK_DEBUG,  # File watcher only for development
+        'post_fork': post_fork,
+        'worker_class': 'gthread',
         'loglevel': 'info',
         'reuse_port': True
     }
@@ -6,9 +6,10 @@ Usage:
 """
 
 import flask
+import config
 from app import app
 
 if __name__ == "__main__":
     print("Starting Quantum Simulation Web Interface")
     print(f"Flask version: {flask.__version__}")
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000, debug=config.FLASK_DEBUG, threaded=True)
\ No newline at end of file
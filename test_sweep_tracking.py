@@ -6,6 +6,7 @@ import os
 import sys
 import datetime
 from flask import Flask
+from sqlalchemy import func
 from models import db, ParameterSweep, SimulationResult
 
 def create_test_sweep():
@@ -15,26 +16,29 @@ def create_test_sweep():
     # Create Flask app context for the test
     app = Flask(__name__)
     app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///quantum_sim.db")
-    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     db.init_app(app)
     
     with app.app_context():
+        # One insert and a few reads: no autoflush before queries and no reload of
+        # the inserted data after commit (the session is scoped to the app context,
+        # so it can only be configured inside it)
+        db.session.configure(autoflush=False, expire_on_commit=False)
+        
         # Create a unique sweep ID
         timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
         sweep_id = f"test_direct_sweep_{timestamp}"
         
         # Create a new sweep record directly
         try:
-            sweep = ParameterSweep()
-            sweep.session_id = sweep_id
-            sweep.circuit_type = "string_twistor_fc"
-            sweep.param1 = "qubits"
-            sweep.param2 = "drive_param"
-            sweep.total_simulations = 4
-            sweep.completed_simulations = 0
-            
-            # Save to database
-            db.session.add(sweep)
+            # Save to database (bulk insert, no ORM object bookkeeping needed)
+            db.session.bulk_insert_mappings(ParameterSweep, [{
+                "session_id": sweep_id,
+                "circuit_type": "string_twistor_fc",
+                "param1": "qubits",
+                "param2": "drive_param",
+                "total_simulations": 4,
+                "completed_simulations": 0
+            }])
             db.session.commit()
             print(f"Successfully created sweep record with ID: {sweep_id}")
             
@@ -48,10 +52,11 @@ def create_test_sweep():
             else:
                 print("Error: Sweep record was not found in database after creation.")
             
-            # List all sweeps in the database
-            print("\nAll parameter sweeps in database:")
-            all_sweeps = ParameterSweep.query.all()
-            for i, s in enumerate(all_sweeps):
+            # Count the sweeps in the database and list the most recent ones
+            sweep_count = db.session.query(func.count(ParameterSweep.id)).scalar()
+            print(f"\n{sweep_count} parameter sweeps in database, most recent:")
+            recent_sweeps = ParameterSweep.query.order_by(ParameterSweep.id.desc()).limit(10).all()
+            for i, s in enumerate(recent_sweeps):
                 print(f"{i+1}. {s.session_id}: {s.circuit_type}, {s.completed_simulations}/{s.total_simulations}")
                 
             return True
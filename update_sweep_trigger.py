@@ -2,184 +2,234 @@
 Script to add a database trigger to ensure parameter sweeps are properly updated.
 This helps fix the issue with parameter sweep simulations not being correctly associated.
 """
-import os
 import sys
-from flask import Flask
-from sqlalchemy import create_engine, text
-from models import db
+import time
+import traceback
+from contextlib import contextmanager
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+from db_utils import get_engine
 
-def create_db_trigger():
-    """Create a database trigger to ensure parameter sweeps are properly tracked."""
-    # Set up Flask application context
-    app = Flask(__name__)
-    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///quantum_sim.db")
-    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-    db.init_app(app)
+# Attempts (with exponential backoff) to get the lock on simulation_results
+# needed to swap the trigger while the web app keeps inserting results
+TRIGGER_LOCK_ATTEMPTS = 5
+TRIGGER_LOCK_BACKOFF = 0.5  # seconds, doubled after each failed attempt
+
+# Upper bound on the statements the installer may run. The installer runs a
+# fixed number of statements (plus lock retries) whatever the number of sweep
+# sessions, so exceeding this means a per-session query loop crept back in.
+MAX_INSTALLER_QUERIES = 30
+
+@contextmanager
+def count_queries(engine):
+    """
+    Record every SQL statement executed on the engine inside the block.
     
-    with app.app_context():
-        print("Setting up parameter sweep tracking improvement...")
+    Args:
+        engine: SQLAlchemy engine
         
-        # Get DB connection information
-        db_uri = app.config["SQLALCHEMY_DATABASE_URI"]
+    Yields:
+        list: Executed statements, filled as they run
+    """
+    queries = []
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        queries.append(statement)
+    
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield queries
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+def _create_sweep_trigger(conn):
+    """Create (or replace) the update_parameter_sweep() function and its trigger."""
+    # Create (or replace in place) a database function to update parameter sweeps.
+    # It is not dropped first: the existing trigger depends on it.
+    conn.execute(text("""
+        CREATE OR REPLACE FUNCTION update_parameter_sweep()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            -- Updates that keep the same sweep session do not change its count
+            IF TG_OP = 'UPDATE' AND NEW.sweep_session IS NOT DISTINCT FROM OLD.sweep_session THEN
+                RETURN NULL;
+            END IF;
+            
+            -- A simulation moved out of a sweep no longer counts for the old one
+            IF TG_OP = 'UPDATE' AND OLD.sweep_session IS NOT NULL THEN
+                UPDATE parameter_sweeps
+                SET completed_simulations = GREATEST(completed_simulations - 1, 0)
+                WHERE session_id = OLD.sweep_session;
+            END IF;
+            
+            -- Only proceed if sweep_session is set
+            IF NEW.sweep_session IS NOT NULL THEN
+                -- Create the parameter sweep record, or count the new simulation
+                -- into the existing one (single upsert on the unique session_id,
+                -- safe against concurrent inserts for a new sweep)
+                INSERT INTO parameter_sweeps AS ps
+                    (session_id, circuit_type, param1, param2, 
+                     total_simulations, completed_simulations, created_at)
+                VALUES
+                    (NEW.sweep_session, NEW.circuit_type, NEW.sweep_param1, NEW.sweep_param2,
+                     1, 1, CURRENT_TIMESTAMP)
+                ON CONFLICT (session_id) DO UPDATE
+                SET completed_simulations = ps.completed_simulations + 1,
+                    total_simulations = GREATEST(ps.total_simulations, ps.completed_simulations + 1);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """))
+    
+    # Create triggers to call this function whenever a simulation is added to a
+    # sweep or moved between sweeps (other updates don't affect the counts).
+    # CREATE OR REPLACE TRIGGER (PostgreSQL 14+) swaps them in place under a SHARE
+    # ROW EXCLUSIVE lock; DROP TRIGGER would need ACCESS EXCLUSIVE.
+    conn.execute(text("""
+        CREATE OR REPLACE TRIGGER simulation_sweep_trigger
+        AFTER INSERT ON simulation_results
+        FOR EACH ROW
+        WHEN (NEW.sweep_session IS NOT NULL)
+        EXECUTE FUNCTION update_parameter_sweep();
         
+        CREATE OR REPLACE TRIGGER simulation_sweep_update_trigger
+        AFTER UPDATE OF sweep_session ON simulation_results
+        FOR EACH ROW
+        WHEN (OLD.sweep_session IS DISTINCT FROM NEW.sweep_session)
+        EXECUTE FUNCTION update_parameter_sweep();
+    """))
+
+def _install_sweep_trigger(engine):
+    """
+    Install the parameter sweep maintenance function and trigger.
+    
+    The trigger is swapped in its own short transaction that takes the table
+    lock with NOWAIT, retrying with backoff instead of queueing behind (and
+    blocking) running inserts. SHARE ROW EXCLUSIVE is all CREATE OR REPLACE
+    TRIGGER needs, so the lock is never upgraded (which would wait without
+    NOWAIT). Requires PostgreSQL 14 or newer.
+    
+    Args:
+        engine: SQLAlchemy engine
+    """
+    delay = TRIGGER_LOCK_BACKOFF
+    for attempt in range(1, TRIGGER_LOCK_ATTEMPTS + 1):
         try:
-            # Create database engine
-            engine = create_engine(db_uri)
-            
-            # Execute a simple query to verify connection
+            with engine.begin() as conn:
+                conn.execute(text("LOCK TABLE simulation_results IN SHARE ROW EXCLUSIVE MODE NOWAIT"))
+                _create_sweep_trigger(conn)
+            return
+        except OperationalError as e:
+            if attempt == TRIGGER_LOCK_ATTEMPTS:
+                raise
+            print(f"simulation_results is busy ({e.orig}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
+            delay *= 2
+
+def create_db_trigger():
+    """Create a database trigger to ensure parameter sweeps are properly tracked."""
+    # Only raw SQL is run here, so no Flask app / ORM session is needed
+    print("Setting up parameter sweep tracking improvement...")
+    
+    try:
+        # Reuse the shared database engine
+        engine = get_engine()
+        
+        # Count the statements to catch query-per-session regressions
+        with count_queries(engine) as queries:
+            # Partial index covering only sweep rows, used by the per-session
+            # lookups and counts below and by the trigger. It is much smaller than
+            # the model's full sweep_session index (most results are not part of
+            # a sweep). Built CONCURRENTLY so inserts are not blocked, which must
+            # run outside a transaction.
             with engine.connect() as conn:
+                conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+                conn.execute(text("""
+                    CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_simulation_results_sweep_session_partial
+                    ON simulation_results (sweep_session)
+                    WHERE sweep_session IS NOT NULL
+                """))
+        
+            # Backfill in one transaction, committed when the block exits
+            with engine.begin() as conn:
                 result = conn.execute(text("SELECT COUNT(*) FROM parameter_sweeps"))
                 sweep_count = result.scalar()
                 print(f"Found {sweep_count} parameter sweep records.")
-                
-                # Create a function to scan for all possible sweep sessions
+            
                 print("Running consistency check on all sweep sessions...")
-                
-                # 1. First, collect unique sweep_session values
-                result = conn.execute(text("""
-                    SELECT DISTINCT sweep_session 
-                    FROM simulation_results 
-                    WHERE sweep_session IS NOT NULL
-                """))
-                
-                sessions = [row[0] for row in result]
-                print(f"Found {len(sessions)} unique sweep sessions in simulation records.")
-                
-                # 2. For each session, check if it has a parameter_sweep record
-                for session_id in sessions:
-                    # Check if parameter sweep record exists
-                    result = conn.execute(text("""
-                        SELECT COUNT(*) FROM parameter_sweeps
-                        WHERE session_id = :session_id
-                    """), {"session_id": session_id})
-                    
-                    has_record = result.scalar() > 0
-                    
-                    if not has_record:
-                        print(f"Creating missing sweep record for {session_id}...")
-                        
-                        # Get information about the first simulation in this sweep
-                        result = conn.execute(text("""
-                            SELECT circuit_type, sweep_param1, sweep_param2, COUNT(*)
-                            FROM simulation_results
-                            WHERE sweep_session = :session_id
-                            GROUP BY circuit_type, sweep_param1, sweep_param2
-                            LIMIT 1
-                        """), {"session_id": session_id})
-                        
-                        row = result.fetchone()
-                        if row:
-                            circuit_type, param1, param2, count = row
-                            
-                            # Insert the parameter sweep record
-                            conn.execute(text("""
-                                INSERT INTO parameter_sweeps 
-                                (session_id, circuit_type, param1, param2, 
-                                 total_simulations, completed_simulations, created_at)
-                                VALUES
-                                (:session_id, :circuit_type, :param1, :param2,
-                                 :count, :count, CURRENT_TIMESTAMP)
-                            """), {
-                                "session_id": session_id,
-                                "circuit_type": circuit_type,
-                                "param1": param1,
-                                "param2": param2,
-                                "count": count
-                            })
-                            
-                            conn.commit()
-                            print(f"  Created sweep record for {session_id} with {count} simulations")
-                
-                # Create a database function to update parameter_sweeps based on simulation results
-                print("\nSetting up automatic parameter sweep maintenance...")
-                
-                # First, check if our maintenance function exists
+            
+                # Create the missing sweep records in a single statement: one row per
+                # sweep session found in simulation_results that has no parameter_sweeps
+                # record yet (anti-join). Circuit type and sweep parameters come from the
+                # session's most common combination (ties broken by value, so reruns are
+                # deterministic); the count covers the whole session.
                 result = conn.execute(text("""
-                    SELECT 1 FROM pg_proc WHERE proname = 'update_parameter_sweep'
-                """))
-                
-                if result.first():
-                    print("Updating existing maintenance function...")
-                    conn.execute(text("DROP FUNCTION IF EXISTS update_parameter_sweep()"))
-                
-                # Create a database function to update parameter sweeps
-                conn.execute(text("""
-                    CREATE OR REPLACE FUNCTION update_parameter_sweep()
-                    RETURNS TRIGGER AS $$
-                    BEGIN
-                        -- Only proceed if sweep_session is set
-                        IF NEW.sweep_session IS NOT NULL THEN
-                            -- Check if this sweep exists
-                            IF NOT EXISTS (SELECT 1 FROM parameter_sweeps WHERE session_id = NEW.sweep_session) THEN
-                                -- Create a new parameter sweep record
-                                INSERT INTO parameter_sweeps 
-                                    (session_id, circuit_type, param1, param2, 
-                                     total_simulations, completed_simulations, created_at)
-                                VALUES
-                                    (NEW.sweep_session, NEW.circuit_type, NEW.sweep_param1, NEW.sweep_param2,
-                                     1, 1, CURRENT_TIMESTAMP);
-                            ELSE
-                                -- Update the existing sweep record
-                                UPDATE parameter_sweeps
-                                SET completed_simulations = (
-                                    SELECT COUNT(*) FROM simulation_results 
-                                    WHERE sweep_session = NEW.sweep_session
-                                ),
-                                total_simulations = GREATEST(
-                                    (SELECT COUNT(*) FROM simulation_results 
-                                     WHERE sweep_session = NEW.sweep_session),
-                                    total_simulations
-                                )
-                                WHERE session_id = NEW.sweep_session;
-                            END IF;
-                        END IF;
-                        RETURN NULL;
-                    END;
-                    $$ LANGUAGE plpgsql;
-                """))
-                
-                # Create a trigger to call this function whenever a simulation is added or updated
-                conn.execute(text("""
-                    DROP TRIGGER IF EXISTS simulation_sweep_trigger ON simulation_results;
-                    
-                    CREATE TRIGGER simulation_sweep_trigger
-                    AFTER INSERT OR UPDATE ON simulation_results
-                    FOR EACH ROW
-                    WHEN (NEW.sweep_session IS NOT NULL)
-                    EXECUTE FUNCTION update_parameter_sweep();
+                    INSERT INTO parameter_sweeps 
+                    (session_id, circuit_type, param1, param2, 
+                     total_simulations, completed_simulations, created_at)
+                    SELECT DISTINCT ON (sweep_session)
+                           sweep_session, circuit_type, sweep_param1, sweep_param2,
+                           session_count, session_count, CURRENT_TIMESTAMP
+                    FROM (
+                        SELECT sr.sweep_session, sr.circuit_type, sr.sweep_param1, sr.sweep_param2,
+                               COUNT(*) AS combo_count,
+                               (SUM(COUNT(*)) OVER (PARTITION BY sr.sweep_session))::integer AS session_count
+                        FROM simulation_results sr
+                        WHERE sr.sweep_session IS NOT NULL
+                          AND NOT EXISTS (
+                              SELECT 1 FROM parameter_sweeps ps
+                              WHERE ps.session_id = sr.sweep_session
+                          )
+                        GROUP BY sr.sweep_session, sr.circuit_type, sr.sweep_param1, sr.sweep_param2
+                    ) combos
+                    ORDER BY sweep_session, combo_count DESC, circuit_type, sweep_param1, sweep_param2
+                    ON CONFLICT (session_id) DO NOTHING
                 """))
-                
-                conn.commit()
-                print("Database trigger for parameter sweep maintenance installed successfully.")
-                
+            
+                print(f"Created {result.rowcount} missing sweep records.")
+            
+                # Refresh planner statistics so the partial index is picked up
+                conn.execute(text("ANALYZE simulation_results"))
+            
+            # Create a database function to update parameter_sweeps based on simulation results
+            print("\nSetting up automatic parameter sweep maintenance...")
+            _install_sweep_trigger(engine)
+            print("Database trigger for parameter sweep maintenance installed successfully.")
+        
+            with engine.begin() as conn:
                 # Refresh existing sweep records based on actual simulation counts
                 print("\nUpdating existing sweep records...")
+                # Count every session once and join the counts onto the sweep records
                 conn.execute(text("""
-                    UPDATE parameter_sweeps ps
-                    SET completed_simulations = (
-                        SELECT COUNT(*) FROM simulation_results 
-                        WHERE sweep_session = ps.session_id
-                    ),
-                    total_simulations = GREATEST(
-                        (SELECT COUNT(*) FROM simulation_results 
-                         WHERE sweep_session = ps.session_id),
-                        ps.total_simulations
+                    WITH counts AS (
+                        SELECT sweep_session AS session_id, COUNT(*) AS n
+                        FROM simulation_results
+                        WHERE sweep_session IS NOT NULL
+                        GROUP BY sweep_session
                     )
+                    UPDATE parameter_sweeps ps
+                    SET completed_simulations = counts.n,
+                        total_simulations = GREATEST(counts.n, ps.total_simulations)
+                    FROM counts
+                    WHERE ps.session_id = counts.session_id
                 """))
-                
-                conn.commit()
                 print("All parameter sweep records updated.")
-                
-        except Exception as e:
-            print(f"Error updating database: {str(e)}")
-            traceback.print_exc()
-            return False
+        
+        # Only a warning: everything above has already been committed
+        print(f"Installer ran {len(queries)} SQL statements.")
+        if len(queries) > MAX_INSTALLER_QUERIES:
+            print(f"Warning: more than {MAX_INSTALLER_QUERIES} SQL statements; "
+                  f"a per-session query loop may have been reintroduced")
             
+    except Exception as e:
+        print(f"Error updating database: {str(e)}")
+        traceback.print_exc()
+        return False
+        
     return True
 
 if __name__ == "__main__":
-    import traceback
-    
     try:
         success = create_db_trigger()
         sys.exit(0 if success else 1)
@@ -5,82 +5,166 @@ Contains helper functions used across the codebase.
 
 import os
 import json
+import gzip
 import datetime
 import traceback
+import importlib.util
 from fractions import Fraction
 import random
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import config
 
+# orjson is optional: it serializes NumPy arrays directly and much faster than json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+def _module_available(name):
+    """Check whether a module can be imported, without importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        # Parent package missing or broken
+        return False
+
 def ensure_dependencies():
     """Check and install required dependencies."""
-    try:
-        import qiskit
-        # Try to import qiskit_aer, but fall back to alternative import if needed
-        try:
-            import qiskit_aer
-        except ImportError:
-            try:
-                from qiskit.providers import aer
-                print("Using qiskit.providers.aer instead of qiskit_aer")
-            except ImportError:
-                print("WARNING: Neither qiskit_aer nor qiskit.providers.aer could be imported")
-        
-        import matplotlib
-        import scipy
-        import numpy as np
-        from scipy import signal
-        # Try to import simps, but use a fallback if not available
-        try:
-            from scipy.integrate import simps  # Using Simpson's rule for potential integration
-        except ImportError:
-            # Define a simple version of Simpson's rule integration as fallback
-            def simps(y, x=None, dx=1.0):
-                """Simple fallback implementation of Simpson's rule integration"""
-                if x is None:
-                    return np.sum(y) * dx
-                else:
-                    return np.trapz(y, x)  # Fall back to trapezoid rule
-        import pandas
-        
-        # PyWavelets is optional - we'll try to import it but won't fail if it's not available
-        try:
-            import pywt
-            print("PyWavelets (pywt) is available.")
-        except ImportError:
-            print("WARNING: PyWavelets (pywt) is not available. Some wavelet analysis features may be limited.")
-        
-        print("Required packages seem to be installed.")
-        return True
-    except ImportError as e:
-        print(f"ERROR: Missing required packages: {e}")
+    # Only locate the packages (find_spec) instead of importing them: the
+    # modules that need them import them anyway
+    required = ["qiskit", "matplotlib", "scipy", "numpy", "pandas"]
+    missing = [name for name in required if not _module_available(name)]
+    if missing:
+        print(f"ERROR: Missing required packages: {', '.join(missing)}")
         print("Please install the following packages: qiskit, matplotlib, scipy, numpy, pandas")
         return False
+    
+    # Check for qiskit_aer, but fall back to alternative import if needed
+    if not _module_available("qiskit_aer"):
+        if _module_available("qiskit.providers.aer"):
+            print("Using qiskit.providers.aer instead of qiskit_aer")
+        else:
+            print("WARNING: Neither qiskit_aer nor qiskit.providers.aer could be imported")
+    
+    # PyWavelets is optional - we'll check for it but won't fail if it's not available
+    if _module_available("pywt"):
+        print("PyWavelets (pywt) is available.")
+    else:
+        print("WARNING: PyWavelets (pywt) is not available. Some wavelet analysis features may be limited.")
+    
+    print("Required packages seem to be installed.")
+    return True
+
+@lru_cache(maxsize=8)
+def _harmonic_ratio_table(max_n, max_m):
+    """
+    Build the table of frequency ratios checked by is_harmonic_related.
+    
+    Ratios are listed in the order they are tested: the drive itself,
+    subharmonics, harmonics, then fractional ratios. A ratio already in the
+    table under an earlier label (e.g. drive*1/2 = drive/2, drive*4/2 = drive*2)
+    is not added again, since the earlier label would always win.
+    
+    Args:
+        max_n (int): Largest harmonic/subharmonic order
+        max_m (int): Largest numerator for fractional ratios
+        
+    Returns:
+        tuple: (ratios array, tuple of relation labels)
+    """
+    # NumPy is imported here, not at module level, so ensure_dependencies() can
+    # still report it as missing
+    import numpy as np
+    
+    candidates = [(Fraction(1), "drive")]
+    candidates += [(Fraction(1, n), f"drive/{n}") for n in range(2, max_n + 1)]  # Subharmonics
+    candidates += [(Fraction(n), f"drive*{n}") for n in range(2, max_n + 1)]  # Harmonics
+    candidates += [(Fraction(m, n), f"drive*{m}/{n}")  # Fractional
+                   for n in range(2, max_n + 1) for m in range(1, max_m + 1) if n != m]
+    
+    ratios = []
+    labels = []
+    seen = set()
+    for ratio, label in candidates:
+        if ratio in seen: continue
+        seen.add(ratio)
+        ratios.append(float(ratio))
+        labels.append(label)
+    ratios = np.array(ratios)
+    ratios.flags.writeable = False
+    return ratios, tuple(labels)
+
+@lru_cache(maxsize=8)
+def _harmonic_ratio_pairs(max_n, max_m):
+    """(ratio, label) pairs of _harmonic_ratio_table as plain Python floats."""
+    ratios, labels = _harmonic_ratio_table(max_n, max_m)
+    return tuple(zip(ratios.tolist(), labels))
 
 def is_harmonic_related(freq, drive_freq, tolerance=0.15, max_n=10, max_m=5):
     """Checks relationship between freq and drive_freq."""
     if freq <= 1e-9 or drive_freq <= 1e-9: return False, "N/A (zero freq)"
-    if abs(freq / drive_freq - 1.0) < tolerance: return True, "drive"
-    for n in range(2, max_n + 1):  # Subharmonics
-        expected = drive_freq / n
-        if abs(freq / expected - 1.0) < tolerance: return True, f"drive/{n}"
-    for n in range(2, max_n + 1):  # Harmonics
-        expected = drive_freq * n
-        if abs(freq / expected - 1.0) < tolerance: return True, f"drive*{n}"
-    for n in range(2, max_n + 1):  # Fractional
-        for m in range(1, max_m + 1):
-            if n == m: continue
-            expected = drive_freq * m / n
-            if abs(freq / expected - 1.0) < tolerance: return True, f"drive*{m}/{n}"
+    r = freq / drive_freq
+    # First ratio (in table order) within tolerance wins
+    for ratio, label in _harmonic_ratio_pairs(max_n, max_m):
+        if abs(r - ratio) < tolerance * ratio: return True, label
     return False, "non-harmonic"
 
+def is_harmonic_related_batch(freqs, drive_freq, tolerance=0.15, max_n=10, max_m=5):
+    """
+    Vectorized is_harmonic_related for an array of frequencies.
+    
+    Args:
+        freqs (array-like): Frequencies to classify
+        drive_freq (float): Drive frequency
+        tolerance (float): Relative tolerance for a ratio match
+        max_n (int): Largest harmonic/subharmonic order
+        max_m (int): Largest numerator for fractional ratios
+        
+    Returns:
+        tuple: (boolean array of matches, array of relation labels)
+    """
+    import numpy as np
+    
+    freqs = np.asarray(freqs, dtype=float)
+    if drive_freq <= 1e-9:
+        return np.zeros(freqs.shape, dtype=bool), np.full(freqs.shape, "N/A (zero freq)", dtype=object)
+    ratios, labels = _harmonic_ratio_table(max_n, max_m)
+    # One row per frequency, one column per ratio; first match per row wins
+    matches = np.abs(freqs[:, None] / (drive_freq * ratios[None, :]) - 1.0) < tolerance
+    best = matches.argmax(axis=1)
+    is_related = matches[np.arange(freqs.size), best]
+    relations = np.array(labels, dtype=object)[best]
+    relations[~is_related] = "non-harmonic"
+    zero_freq = freqs <= 1e-9
+    is_related[zero_freq] = False
+    relations[zero_freq] = "N/A (zero freq)"
+    return is_related, relations
+
+# Bound str.format methods per format spec, used by format_param
+_FORMATTERS = {}
+
 def format_param(value, fmt_spec):
     """Safely formats numeric values, passes others as strings."""
     if isinstance(value, (int, float)):
-        try: return f"{value:{fmt_spec}}"
+        formatter = _FORMATTERS.get(fmt_spec)
+        if formatter is None:
+            formatter = _FORMATTERS[fmt_spec] = ("{:" + fmt_spec + "}").format
+        try: return formatter(value)
         except ValueError: return str(value)
     else: return str(value)
 
+def _make_dir(path):
+    """Create a single directory, falling back to makedirs if a parent is missing."""
+    try:
+        os.mkdir(path)
+    except FileExistsError:
+        pass
+    except FileNotFoundError:
+        os.makedirs(path, exist_ok=True)
+
 def create_folder_structure(circuit_type, param_set_name):
     """
     Create and return paths for this analysis run.
@@ -88,30 +172,41 @@ def create_folder_structure(circuit_type, param_set_name):
     timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
     folder_name = f"{circuit_type}_{param_set_name}_{timestamp}"
     
-    # Create primary result folder
+    # The base folders normally exist already, so each run only creates its own
+    # folders (one mkdir each instead of a makedirs walk over every parent)
     res_path = os.path.join(config.RESULTS_BASE_PATH, folder_name)
-    os.makedirs(res_path, exist_ok=True)
-    
-    # Create figures subfolder directly in the results path
     fig_path = os.path.join(res_path, 'figures')
-    os.makedirs(fig_path, exist_ok=True)
+    _make_dir(res_path)
+    _make_dir(fig_path)
     
     # Create data folder
     data_path = os.path.join(config.NUMERIC_DATA_BASE_PATH, folder_name)
-    os.makedirs(data_path, exist_ok=True)
+    _make_dir(data_path)
     
     return fig_path, res_path, data_path
 
+# Google Drive save folder, set after the first successful mount
+_GDRIVE_SAVE_PATH = None
+
 def setup_gdrive_if_needed():
-    """Setup Google Drive if enabled."""
+    """
+    Setup Google Drive if enabled.
+    
+    The mount is done once per process; later calls (every simulation of a
+    parameter scan calls this) return the cached save folder.
+    """
+    global _GDRIVE_SAVE_PATH
     if not config.SAVE_TO_GOOGLE_DRIVE:
         return None
+    if _GDRIVE_SAVE_PATH is not None:
+        return _GDRIVE_SAVE_PATH
     
     try:
         from google.colab import drive
         drive.mount(config.GDRIVE_MOUNT_POINT)
         gdrive_save_path = os.path.join(config.GDRIVE_MOUNT_POINT, config.GDRIVE_SAVE_FOLDER)
         os.makedirs(gdrive_save_path, exist_ok=True)
+        _GDRIVE_SAVE_PATH = gdrive_save_path
         return gdrive_save_path
     except (ImportError, ModuleNotFoundError):
         print("Google Colab drive module not available. Saving to Google Drive disabled.")
@@ -127,26 +222,87 @@ def save_to_gdrive(gdrive_save_path, local_fig_path, local_res_path, local_data_
     
     import shutil
     try:
-        # Create target directories
-        gdrive_fig_path = os.path.join(gdrive_save_path, os.path.basename(local_fig_path))
-        gdrive_res_path = os.path.join(gdrive_save_path, os.path.basename(local_res_path))
-        gdrive_data_path = os.path.join(gdrive_save_path, os.path.basename(local_data_path))
+        # Copy each local folder as a tree (created if missing). The figures
+        # folder normally lives inside the results folder and is copied with it.
+        copies = [(local_res_path, os.path.join(gdrive_save_path, os.path.basename(local_res_path))),
+                  (local_data_path, os.path.join(gdrive_save_path, os.path.basename(local_data_path)))]
+        if os.path.dirname(local_fig_path) != local_res_path:
+            copies.append((local_fig_path, os.path.join(gdrive_save_path, os.path.basename(local_fig_path))))
         
-        os.makedirs(gdrive_fig_path, exist_ok=True)
-        os.makedirs(gdrive_res_path, exist_ok=True)
-        os.makedirs(gdrive_data_path, exist_ok=True)
-        
-        # Copy files
-        for file in os.listdir(local_fig_path):
-            shutil.copy2(os.path.join(local_fig_path, file), gdrive_fig_path)
-        
-        for file in os.listdir(local_res_path):
-            shutil.copy2(os.path.join(local_res_path, file), gdrive_res_path)
-            
-        for file in os.listdir(local_data_path):
-            shutil.copy2(os.path.join(local_data_path, file), gdrive_data_path)
+        # Plain copies (file metadata is not needed on the Drive side). The folders
+        # are independent, so they are copied concurrently to overlap the
+        # latency of the Drive mount.
+        with ThreadPoolExecutor(max_workers=len(copies)) as executor:
+            futures = [executor.submit(shutil.copytree, src, dst, dirs_exist_ok=True,
+                                       copy_function=shutil.copy)
+                       for src, dst in copies]
+            for future in futures:
+                future.result()
             
         print(f"Successfully copied results to Google Drive: {gdrive_save_path}")
     except Exception as e:
         print(f"Error copying to Google Drive: {e}")
         traceback.print_exc()
+
+def list_figure_files(folder):
+    """
+    List the figure image files in a folder.
+    
+    Args:
+        folder (str): Folder to search
+        
+    Returns:
+        list: Sorted full paths of the files with a figure extension (config.FIGURE_EXTENSIONS)
+    """
+    try:
+        with os.scandir(folder) as entries:
+            return sorted(entry.path for entry in entries
+                          if entry.is_file() and entry.name.rsplit('.', 1)[-1].lower() in config.FIGURE_EXTENSIONS)
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+def _json_default(obj):
+    """Convert NumPy arrays/scalars that the JSON encoder can't serialize natively."""
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def save_json(data, path):
+    """
+    Save a dictionary (which may contain NumPy arrays) as JSON.
+    
+    Paths ending in '.gz' are written compact and gzip-compressed (compresslevel=1),
+    everything else as indented plain JSON. Uses orjson with native NumPy
+    serialization when it is installed, otherwise the standard json module.
+    """
+    compress = path.endswith('.gz')
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if not compress:
+            option |= orjson.OPT_INDENT_2
+        payload = orjson.dumps(data, default=_json_default, option=option)
+        with (gzip.open(path, 'wb', compresslevel=1) if compress else open(path, 'wb')) as f:
+            f.write(payload)
+    elif compress:
+        with gzip.open(path, 'wt', compresslevel=1) as f:
+            json.dump(data, f, default=_json_default)
+    else:
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2, default=_json_default)
+
+def load_json(path):
+    """
+    Load a JSON file saved by save_json.
+    
+    Falls back to the gzip-compressed variant (path + '.gz') if the plain file doesn't exist.
+    
+    Returns:
+        The decoded data, or None if neither file exists
+    """
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            return json.load(f)
+    if os.path.exists(path + '.gz'):
+        with gzip.open(path + '.gz', 'rt') as f:
+            return json.load(f)
+    return None
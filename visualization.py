@@ -7,12 +7,319 @@ import numpy as np
 # Configure matplotlib to use a non-interactive backend (avoid 'main thread' warnings)
 import matplotlib
 matplotlib.use('Agg')  # Must be before importing pyplot
+# Shared plot style, set once instead of per axes: dashed grid on every axes,
+# legends in the upper right, and stronger line simplification / chunked
+# rendering for the long FFT lines
+matplotlib.rcParams.update({
+    'axes.grid': True,
+    'grid.linestyle': '--',
+    'grid.alpha': 0.7,
+    'legend.loc': 'upper right',
+    'path.simplify': True,
+    'path.simplify_threshold': 1.0,
+    'agg.path.chunksize': 10000,
+})
 import matplotlib.pyplot as plt
+import matplotlib.font_manager as fm
+# Resolve the default font once at import: the font list itself is loaded when
+# matplotlib.font_manager is imported, but the first findfont() still scores every
+# installed font. Done here, it happens in the gunicorn master (preload_app) and
+# forked workers inherit the cached lookup.
+fm.findfont(fm.FontProperties())
+import io
 import os
-import json
-import datetime
+import shutil
+import hashlib
+import tempfile
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from matplotlib.figure import Figure
-import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+import config
+# numba is optional: it speeds up the plot decimation loop
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Spectra longer than this are decimated before plotting (a figure is only
+# ~1000-2000 pixels wide, so more vertices only cost rendering time)
+MAX_PLOT_POINTS = 4000
+
+# Saved figures are web-page sized PNGs, written with fast zlib compression
+SAVEFIG_DPI = 100
+PNG_SAVE_OPTIONS = {'compress_level': 1, 'optimize': False}
+
+# Pillow options for the lossy analysis plot formats (config.PLOT_FORMAT)
+PLOT_SAVE_OPTIONS = {
+    'png': PNG_SAVE_OPTIONS,
+    'webp': {'quality': 85, 'method': 4},
+    'jpg': {'quality': 85, 'progressive': True},
+}
+
+def _write_figure(fig, path, fmt, **savefig_kw):
+    """
+    Render a figure in memory and write it to path with a single write.
+    
+    The figures are written once and rarely read back by this process, so the
+    file is flushed and the kernel is told it can drop it from the page cache
+    (dirty pages can't be dropped, hence the fdatasync first).
+    
+    Args:
+        fig (Figure): Figure to save
+        path (str): Output file
+        fmt (str): Image format ('png', 'webp', 'jpg', 'svg', ...)
+        **savefig_kw: Extra arguments for fig.savefig
+    """
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt, **savefig_kw)
+    data = buf.getbuffer()
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        written = 0
+        while written < len(data):
+            written += os.write(fd, data[written:])
+        try:
+            os.fdatasync(fd)
+            os.posix_fadvise(fd, 0, len(data), os.POSIX_FADV_DONTNEED)
+        except (AttributeError, OSError):
+            pass  # Not available on this platform/filesystem
+    finally:
+        os.close(fd)
+
+def _save_plot(fig, save_path, name):
+    """
+    Save an analysis plot in the configured image format (config.PLOT_FORMAT).
+    
+    Args:
+        fig (Figure): Figure to save
+        save_path (str): Folder to save into
+        name (str): File name without extension
+        
+    Returns:
+        str: Path of the saved file
+    """
+    ext = config.PLOT_FORMAT if config.PLOT_FORMAT in PLOT_SAVE_OPTIONS else 'png'
+    fig_filename = os.path.join(save_path, f"{name}.{ext}")
+    _write_figure(fig, fig_filename, ext, dpi=SAVEFIG_DPI, pil_kwargs=PLOT_SAVE_OPTIONS[ext])
+    return fig_filename
+
+# Threads for drawing independent saved plots concurrently (Agg releases the GIL
+# while rasterizing and encoding); see plot_all_async
+_PLOT_POOL = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 2))
+
+def _reset_plot_pool():
+    """
+    Give a forked child process (parameter scan worker) its own plot pool.
+    
+    The child inherits the executor but not its threads, so jobs submitted to
+    the inherited pool would never run.
+    """
+    global _PLOT_POOL
+    _PLOT_POOL = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 2))
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_plot_pool)
+
+# Figures reused by plots that are only saved to file: one pool per thread (a
+# figure can't be drawn by two threads at once) of at most _FIG_POOL_SIZE layouts,
+# least recently used dropped first. Keyed weakly by thread, so the figures of a
+# finished thread are released; clear_figure_pool() releases all of them.
+_FIG_POOLS = weakref.WeakKeyDictionary()
+_FIG_POOLS_LOCK = threading.Lock()
+_FIG_POOL_SIZE = 4
+
+def clear_figure_pool():
+    """Release the figures kept for reuse by every thread (e.g. when a parameter scan ends)."""
+    with _FIG_POOLS_LOCK:
+        _FIG_POOLS.clear()
+
+def _new_figure(interactive, nrows=1, ncols=1, figsize=None, reuse=False, **subplot_kw):
+    """
+    Create a figure and its axes (same return value as plt.subplots).
+    
+    Figures that are only saved or returned are created without pyplot, on their
+    own Agg canvas: they are not registered in pyplot's global figure manager, so
+    concurrent simulations in the web app don't share pyplot state, no figure is
+    left open (nothing to plt.close) and savefig doesn't swap in a temporary canvas.
+    
+    All figures use constrained layout, applied while drawing, so the plot
+    functions don't need a separate tight_layout() pass.
+    
+    Args:
+        interactive (bool): Whether the figure will be shown with plt.show()
+        nrows, ncols (int): Subplot grid
+        figsize (tuple): Figure size in inches
+        reuse (bool): Reuse (with cleared axes) the figure from an earlier call
+            with the same layout. Only for figures that are saved and not returned.
+    
+    The reuse pool is kept per thread rather than as one lock-guarded pool per
+    process: a pooled figure is then never handed to two threads at once, and the
+    lock is only taken to find the calling thread's pool. Forked children start
+    with a copy of the parent's pool, which only their main thread uses.
+    """
+    if interactive:
+        return plt.subplots(nrows, ncols, figsize=figsize, layout='constrained', **subplot_kw)
+    if reuse:
+        thread = threading.current_thread()
+        with _FIG_POOLS_LOCK:
+            pool = _FIG_POOLS.get(thread)
+            if pool is None:
+                pool = _FIG_POOLS[thread] = {}
+        key = (nrows, ncols, figsize, tuple(sorted(subplot_kw.items())))
+        pooled = pool.pop(key, None)
+        if pooled is not None:
+            pool[key] = pooled  # Now the most recently used
+            fig, axes = pooled
+            for ax in np.atleast_1d(axes).flat:
+                ax.cla()
+            return fig, axes
+    fig = Figure(figsize=figsize, layout='constrained')
+    FigureCanvasAgg(fig)
+    axes = fig.subplots(nrows, ncols, **subplot_kw)
+    if reuse:
+        if len(pool) >= _FIG_POOL_SIZE:
+            pool.pop(next(iter(pool)))  # Drop the least recently used layout
+        pool[key] = (fig, axes)
+    return fig, axes
+
+def _minmax_indices_numpy(y, n_buckets):
+    """
+    Indices of the minimum and maximum of y in each of n_buckets equal chunks.
+    
+    Args:
+        y (np.ndarray): Values to decimate
+        n_buckets (int): Number of chunks
+        
+    Returns:
+        np.ndarray: Two indices per chunk, in increasing order
+    """
+    bucket = -(-y.size // n_buckets)
+    n_chunks = -(-y.size // bucket)
+    # Pad the last chunk by repeating the final element
+    idx = np.minimum(np.arange(n_chunks * bucket), y.size - 1).reshape(n_chunks, bucket)
+    chunks = y[idx]
+    starts = np.arange(n_chunks) * bucket
+    imin = np.minimum(starts + chunks.argmin(axis=1), y.size - 1)
+    imax = np.minimum(starts + chunks.argmax(axis=1), y.size - 1)
+    return np.column_stack((np.minimum(imin, imax), np.maximum(imin, imax))).ravel()
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _minmax_indices(y, n_buckets):
+        """Compiled version of _minmax_indices_numpy (one pass over y)."""
+        n = y.size
+        bucket = (n + n_buckets - 1) // n_buckets
+        n_chunks = (n + bucket - 1) // bucket
+        out = np.empty(2 * n_chunks, np.int64)
+        for c in range(n_chunks):
+            start = c * bucket
+            stop = min(start + bucket, n)
+            imin = start
+            imax = start
+            for i in range(start + 1, stop):
+                if y[i] < y[imin]:
+                    imin = i
+                if y[i] > y[imax]:
+                    imax = i
+            out[2 * c] = min(imin, imax)
+            out[2 * c + 1] = max(imin, imax)
+        return out
+else:
+    _minmax_indices = _minmax_indices_numpy
+
+def _decimate_for_plot(x, y, max_points=MAX_PLOT_POINTS):
+    """
+    Reduce a line to at most ~max_points vertices, keeping every peak.
+    
+    Each chunk of the data is replaced by its minimum and maximum, so the
+    plotted line has the same envelope as the full data.
+    
+    Args:
+        x (np.ndarray): X values
+        y (np.ndarray): Y values
+        max_points (int): Maximum number of points to plot (None/0 to disable)
+        
+    Returns:
+        tuple: (x, y) to plot
+    """
+    if not max_points or y.size <= max_points:
+        return x, y
+    idx = _minmax_indices(np.ascontiguousarray(y), max(1, max_points // 2))
+    return x[idx], y[idx]
+
+def _display_slice(pos_freqs, mx_fft_amp, mz_fft_amp, max_freq_display):
+    """
+    Restrict the spectra to frequencies up to max_freq_display.
+    
+    pos_freqs is sorted (rfftfreq order), so the cut is a single binary search
+    and the returned arrays are slices (views) of the inputs, not copies.
+    
+    Args:
+        pos_freqs (np.ndarray): Positive frequency bins (increasing)
+        mx_fft_amp, mz_fft_amp (np.ndarray): FFT amplitudes on those bins
+        max_freq_display (float): Highest frequency to show (None/0 for all)
+        
+    Returns:
+        tuple: (frequencies, X amplitudes, Z amplitudes) to display
+    """
+    if not max_freq_display or max_freq_display <= 0:
+        return pos_freqs, mx_fft_amp, mz_fft_amp
+    stop = np.searchsorted(pos_freqs, max_freq_display, side='right')
+    return pos_freqs[:stop], mx_fft_amp[:stop], mz_fft_amp[:stop]
+
+def _mark_comb_teeth(ax, freqs, tooth_numbers, label_fmt, amplitudes=None):
+    """
+    Mark comb teeth with vertical lines (and optional peak markers).
+    
+    The first three teeth get their own labelled line for the legend; the rest
+    are drawn as a single LineCollection and the markers as a single line,
+    instead of one artist per tooth.
+    
+    Args:
+        ax (Axes): Axes to draw on
+        freqs (array-like): Tooth frequencies
+        tooth_numbers (array-like): Tooth numbers (1-based)
+        label_fmt (str): Legend label format with {n} and {freq} fields
+        amplitudes (array-like, optional): Peak amplitudes to mark with dots
+    """
+    freqs = np.asarray(freqs, dtype=float)
+    tooth_numbers = np.asarray(tooth_numbers)
+    labelled = tooth_numbers <= 3  # Label only first few teeth
+    for freq, n in zip(freqs[labelled], tooth_numbers[labelled]):
+        ax.axvline(x=freq, color='orange', linestyle=':', label=label_fmt.format(n=n, freq=freq), alpha=0.6)
+    
+    rest = freqs[~labelled]
+    if rest.size:
+        # Full-height vertical segments: x in data coordinates, y in axes coordinates
+        segments = np.stack([np.column_stack([rest, np.zeros_like(rest)]),
+                             np.column_stack([rest, np.ones_like(rest)])], axis=1)
+        ax.add_collection(LineCollection(segments, transform=ax.get_xaxis_transform(),
+                                         colors='orange', linestyles=':', alpha=0.4),
+                          autolim=False)
+    
+    if amplitudes is not None:
+        # Add a marker at each peak
+        ax.plot(freqs, amplitudes, 'o', color='orange', markersize=5)
+
+def plot_all_async(jobs):
+    """
+    Run independent plot functions concurrently.
+    
+    Only for plots that are saved to file (not shown): every call builds its
+    own pyplot-free Figure (see _new_figure), so the threads share no figure.
+    
+    Args:
+        jobs (list): (function, args, kwargs) tuples, e.g.
+            (plot_fft_analysis, (analysis,), {'save_path': fig_path})
+        
+    Returns:
+        list: One Future per job, resolving to the function's return value
+    """
+    return [_PLOT_POOL.submit(fn, *args, **kwargs) for fn, args, kwargs in jobs]
 
 def plot_expectation_values(times, expectation_values, plot_title='Qubit Expectation Values', 
                            show_plot=False, save_path=None, save_prefix='expectation'):
@@ -25,7 +332,7 @@ def plot_expectation_values(times, expectation_values, plot_title='Qubit Expecta
     mz_values = expectation_values['mz']
     
     # Create figure
-    fig, ax = plt.subplots(figsize=(10, 6))
+    fig, ax = _new_figure(show_plot and not save_path, figsize=(10, 6), reuse=bool(save_path))
     
     # Plot each component
     ax.plot(times, mx_values, 'r-', label='<X>', alpha=0.7)
@@ -36,34 +343,47 @@ def plot_expectation_values(times, expectation_values, plot_title='Qubit Expecta
     ax.set_xlabel('Time')
     ax.set_ylabel('Expectation Value')
     ax.set_title(plot_title)
-    ax.grid(True, linestyle='--', alpha=0.7)
     ax.legend()
     
     # Set y-axis limits slightly beyond [-1, 1]
     ax.set_ylim(-1.1, 1.1)
     
-    # Save the figure if a path is provided
+    # Save the figure if a path is provided (constrained layout, so savefig needs
+    # no bbox_inches='tight', which renders the whole figure an extra time)
     if save_path:
-        fig_filename = os.path.join(save_path, f"{save_prefix}_values.png")
-        fig.savefig(fig_filename, dpi=150, bbox_inches='tight')
-        plt.close(fig)
-        return fig_filename
+        return _save_plot(fig, save_path, f"{save_prefix}_values")
     
     # Show if requested (and return figure)
     if show_plot:
-        plt.tight_layout()
         plt.show()
-    else:
-        plt.close(fig)
     
     return fig
 
-def plot_fft_analysis(analysis, drive_freq=None, plot_title='FFT Analysis', 
-                     show_plot=False, save_path=None, save_prefix='fft', 
-                     highlight_harmonics=True, highlight_incommensurate=True,
-                     fc_analysis=None, max_freq_display=None):
+def _plot_spectrum(analysis, overlays, plot_title, show_plot, save_path, save_prefix,
+                   figsize, line_alpha, data_description='', log_x=False,
+                   max_freq_display=None, max_points=MAX_PLOT_POINTS):
     """
-    Plot FFT analysis of expectation values, highlighting key frequencies.
+    Shared body of the FFT-spectrum plots: X and Z spectra on two stacked axes.
+    
+    Args:
+        analysis (dict): FFT analysis with 'positive_frequencies', 'mx_fft_pos', 'mz_fft_pos'
+        overlays (list): Highlights to draw, dicts with 'axis' (1 = X, 2 = Z) and 'type':
+            'axvline' ('x', 'label', 'style' kwargs) or 'teeth' ('freqs', 'numbers',
+            'label_fmt', optional 'amplitudes'; see _mark_comb_teeth)
+        plot_title (str): Title prefix of the X axes
+        show_plot (bool): Show the figure interactively
+        save_path (str): Folder to save the figure into (None to not save)
+        save_prefix (str): File name prefix
+        figsize (tuple): Figure size in inches
+        line_alpha (float): Opacity of the spectrum lines
+        data_description (str): Appended to the missing-data warning
+        log_x (bool): Logarithmic frequency axis (spectrum without the DC bin,
+            not cut or decimated, and no shared x axis)
+        max_freq_display (float): Highest frequency to show (linear axis only)
+        max_points (int): Decimation limit for the spectrum lines (linear axis only)
+        
+    Returns:
+        str or Figure: Saved file path if save_path is given, else the figure (None if no data)
     """
     # Get frequency data
     pos_freqs = analysis.get('positive_frequencies', np.array([]))
@@ -71,60 +391,82 @@ def plot_fft_analysis(analysis, drive_freq=None, plot_title='FFT Analysis',
     mz_fft_amp = analysis.get('mz_fft_pos', np.array([]))
     
     if pos_freqs.size == 0 or mx_fft_amp.size == 0 or mz_fft_amp.size == 0:
-        print("Warning: Missing FFT data for plotting.")
+        print(f"Warning: Missing FFT data for plotting{data_description}.")
         return None
     
     # Create figure
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8), sharex=True)
-    
-    # Limit x-axis if specified
-    if max_freq_display and max_freq_display > 0:
-        display_mask = pos_freqs <= max_freq_display
-        display_freqs = pos_freqs[display_mask]
-        display_mx = mx_fft_amp[display_mask]
-        display_mz = mz_fft_amp[display_mask]
+    fig, (ax1, ax2) = _new_figure(show_plot and not save_path, 2, 1, figsize=figsize,
+                                  reuse=bool(save_path), sharex=not log_x)
+    
+    if log_x:
+        # Plot on log scale, skipping DC
+        ax1.semilogx(pos_freqs[1:], mx_fft_amp[1:], 'r-', label='FFT(<X>)', alpha=line_alpha)
+        ax2.semilogx(pos_freqs[1:], mz_fft_amp[1:], 'b-', label='FFT(<Z>)', alpha=line_alpha)
+        for ax in (ax1, ax2):
+            ax.grid(True, which='both')  # Minor (log) ticks too
+        ax2.set_xlabel('Frequency (log scale)')
     else:
-        display_freqs = pos_freqs
-        display_mx = mx_fft_amp
-        display_mz = mz_fft_amp
+        # Limit x-axis if specified
+        display_freqs, display_mx, display_mz = _display_slice(pos_freqs, mx_fft_amp, mz_fft_amp, max_freq_display)
+        ax1.plot(*_decimate_for_plot(display_freqs, display_mx, max_points), 'r-', label='FFT(<X>)', alpha=line_alpha)
+        ax2.plot(*_decimate_for_plot(display_freqs, display_mz, max_points), 'b-', label='FFT(<Z>)', alpha=line_alpha)
+        ax2.set_xlabel('Frequency')
     
-    # Plot FFT for X component
-    ax1.plot(display_freqs, display_mx, 'r-', label='FFT(<X>)', alpha=0.7)
     ax1.set_ylabel('|FFT(<X>)|')
     ax1.set_title(f'{plot_title} - X Component')
-    ax1.grid(True, linestyle='--', alpha=0.7)
-    
-    # Plot FFT for Z component
-    ax2.plot(display_freqs, display_mz, 'b-', label='FFT(<Z>)', alpha=0.7)
-    ax2.set_xlabel('Frequency')
     ax2.set_ylabel('|FFT(<Z>)|')
     ax2.set_title('Z Component')
-    ax2.grid(True, linestyle='--', alpha=0.7)
+    
+    # Draw the highlights
+    for overlay in overlays:
+        ax = ax1 if overlay['axis'] == 1 else ax2
+        if overlay['type'] == 'axvline':
+            ax.axvline(x=overlay['x'], label=overlay['label'], **overlay['style'])
+        elif overlay['type'] == 'teeth':
+            _mark_comb_teeth(ax, overlay['freqs'], overlay['numbers'], overlay['label_fmt'],
+                             amplitudes=overlay.get('amplitudes'))
+    
+    # Add legends
+    ax1.legend()
+    ax2.legend()
+    
+    # Save the figure if a path is provided
+    if save_path:
+        return _save_plot(fig, save_path, f"{save_prefix}_analysis")
+    
+    # Show if requested (and return figure)
+    if show_plot:
+        plt.show()
+    
+    return fig
+
+def plot_fft_analysis(analysis, drive_freq=None, plot_title='FFT Analysis', 
+                     show_plot=False, save_path=None, save_prefix='fft', 
+                     highlight_harmonics=True, highlight_incommensurate=True,
+                     fc_analysis=None, max_freq_display=None, max_points=MAX_PLOT_POINTS):
+    """
+    Plot FFT analysis of expectation values, highlighting key frequencies.
+    """
+    overlays = []
     
     # Highlight drive frequency if provided
     if drive_freq is not None:
-        for ax in [ax1, ax2]:
-            ax.axvline(x=drive_freq, color='green', linestyle='--', label=f'Drive ({drive_freq:.3f})')
+        for axis in (1, 2):
+            overlays.append({'axis': axis, 'type': 'axvline', 'x': drive_freq,
+                             'label': f'Drive ({drive_freq:.3f})',
+                             'style': {'color': 'green', 'linestyle': '--'}})
     
-    # Highlight specific frequencies if requested
+    # Highlight primary frequencies found in the analysis if requested
     if highlight_harmonics:
-        # Highlight primary frequencies found in the analysis
-        primary_mx_freq = analysis.get('primary_mx_freq', 0)
-        primary_mz_freq = analysis.get('primary_mz_freq', 0)
-        
-        if primary_mx_freq > 0:
-            relation = analysis.get('mx_harmonic_relation', '')
-            label = f'Primary X ({primary_mx_freq:.3f})'
-            if relation:
-                label += f' - {relation}'
-            ax1.axvline(x=primary_mx_freq, color='purple', linestyle='-.', alpha=0.7, label=label)
-        
-        if primary_mz_freq > 0:
-            relation = analysis.get('mz_harmonic_relation', '')
-            label = f'Primary Z ({primary_mz_freq:.3f})'
-            if relation:
-                label += f' - {relation}'
-            ax2.axvline(x=primary_mz_freq, color='purple', linestyle='-.', alpha=0.7, label=label)
+        for axis, component in ((1, 'mx'), (2, 'mz')):
+            primary_freq = analysis.get(f'primary_{component}_freq', 0)
+            if primary_freq > 0:
+                relation = analysis.get(f'{component}_harmonic_relation', '')
+                label = f'Primary {component[1].upper()} ({primary_freq:.3f})'
+                if relation:
+                    label += f' - {relation}'
+                overlays.append({'axis': axis, 'type': 'axvline', 'x': primary_freq, 'label': label,
+                                 'style': {'color': 'purple', 'linestyle': '-.', 'alpha': 0.7}})
     
     # Highlight incommensurate frequencies if requested and available
     if highlight_incommensurate and fc_analysis:
@@ -134,156 +476,52 @@ def plot_fft_analysis(analysis, drive_freq=None, plot_title='FFT Analysis',
             basis = strongest_peak.get('basis', '')
             ratio = strongest_peak.get('ratio_to_drive', 0)
             
-            if freq > 0:
-                label = f'Incomm ({freq:.3f}, ratio={ratio:.3f})'
-                if basis == 'Mx':
-                    ax1.axvline(x=freq, color='orange', linestyle=':', alpha=0.8, label=label)
-                elif basis == 'Mz':
-                    ax2.axvline(x=freq, color='orange', linestyle=':', alpha=0.8, label=label)
-    
-    # Add legends
-    ax1.legend(loc='upper right')
-    ax2.legend(loc='upper right')
-    
-    # Adjust layout
-    plt.tight_layout()
-    
-    # Save the figure if a path is provided
-    if save_path:
-        fig_filename = os.path.join(save_path, f"{save_prefix}_analysis.png")
-        fig.savefig(fig_filename, dpi=150, bbox_inches='tight')
-        plt.close(fig)
-        return fig_filename
-    
-    # Show if requested (and return figure)
-    if show_plot:
-        plt.show()
-    else:
-        plt.close(fig)
-    
-    return fig
+            if freq > 0 and basis in ('Mx', 'Mz'):
+                overlays.append({'axis': 1 if basis == 'Mx' else 2, 'type': 'axvline', 'x': freq,
+                                 'label': f'Incomm ({freq:.3f}, ratio={ratio:.3f})',
+                                 'style': {'color': 'orange', 'linestyle': ':', 'alpha': 0.8}})
+    
+    return _plot_spectrum(analysis, overlays, plot_title, show_plot, save_path, save_prefix,
+                          figsize=(10, 8), line_alpha=0.7,
+                          max_freq_display=max_freq_display, max_points=max_points)
 
 def plot_frequency_comb_analysis(analysis, comb_analysis, drive_freq=None, 
                                plot_title='Frequency Comb Analysis',
                                show_plot=False, save_path=None, save_prefix='comb',
-                               max_freq_display=None):
+                               max_freq_display=None, max_points=MAX_PLOT_POINTS):
     """
     Plot frequency comb analysis, highlighting detected comb structures.
     """
-    # Get frequency data
-    pos_freqs = analysis.get('positive_frequencies', np.array([]))
-    mx_fft_amp = analysis.get('mx_fft_pos', np.array([]))
-    mz_fft_amp = analysis.get('mz_fft_pos', np.array([]))
-    
-    if pos_freqs.size == 0 or mx_fft_amp.size == 0 or mz_fft_amp.size == 0:
-        print("Warning: Missing FFT data for plotting frequency comb analysis.")
-        return None
-    
-    # Create figure
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10), sharex=True)
-    
-    # Limit x-axis if specified
-    if max_freq_display and max_freq_display > 0:
-        display_mask = pos_freqs <= max_freq_display
-        display_freqs = pos_freqs[display_mask]
-        display_mx = mx_fft_amp[display_mask]
-        display_mz = mz_fft_amp[display_mask]
-    else:
-        display_freqs = pos_freqs
-        display_mx = mx_fft_amp
-        display_mz = mz_fft_amp
-    
-    # Plot FFT for X component
-    ax1.plot(display_freqs, display_mx, 'r-', label='FFT(<X>)', alpha=0.5)
-    ax1.set_ylabel('|FFT(<X>)|')
-    ax1.set_title(f'{plot_title} - X Component')
-    ax1.grid(True, linestyle='--', alpha=0.6)
-    
-    # Plot FFT for Z component
-    ax2.plot(display_freqs, display_mz, 'b-', label='FFT(<Z>)', alpha=0.5)
-    ax2.set_xlabel('Frequency')
-    ax2.set_ylabel('|FFT(<Z>)|')
-    ax2.set_title('Z Component')
-    ax2.grid(True, linestyle='--', alpha=0.6)
+    overlays = []
     
     # Highlight drive frequency if provided
     if drive_freq is not None:
-        for ax in [ax1, ax2]:
-            ax.axvline(x=drive_freq, color='green', linestyle='--', 
-                      label=f'Drive ({drive_freq:.3f})', alpha=0.7)
+        for axis in (1, 2):
+            overlays.append({'axis': axis, 'type': 'axvline', 'x': drive_freq,
+                             'label': f'Drive ({drive_freq:.3f})',
+                             'style': {'color': 'green', 'linestyle': '--', 'alpha': 0.7}})
     
     # Highlight detected linear frequency combs
-    # X component comb
-    if comb_analysis.get('mx_comb_found', False):
-        omega = comb_analysis.get('mx_best_omega', 0)
-        teeth = comb_analysis.get('mx_comb_details', [])
+    for axis, component in ((1, 'mx'), (2, 'mz')):
+        if not comb_analysis.get(f'{component}_comb_found', False):
+            continue
+        omega = comb_analysis.get(f'{component}_best_omega', 0)
+        teeth = comb_analysis.get(f'{component}_comb_details', [])
         
         if omega > 0 and teeth:
-            # Mark Omega value
-            ax1.axvline(x=omega, color='purple', linestyle='-.',
-                       label=f'Ω = {omega:.3f}', alpha=0.7)
-            
-            # Mark each tooth with a vertical line
-            for tooth in teeth:
-                freq = tooth.get('freq', 0)
-                amp = tooth.get('amplitude', 0)
-                tooth_num = tooth.get('tooth_number', 0)
-                
-                if tooth_num <= 3:  # Label only first few teeth
-                    ax1.axvline(x=freq, color='orange', linestyle=':',
-                              label=f'{tooth_num}Ω = {freq:.3f}', alpha=0.6)
-                else:
-                    ax1.axvline(x=freq, color='orange', linestyle=':', alpha=0.4)
-                
-                # Add a marker at the peak
-                ax1.plot(freq, amp, 'o', color='orange', markersize=5)
-    
-    # Z component comb
-    if comb_analysis.get('mz_comb_found', False):
-        omega = comb_analysis.get('mz_best_omega', 0)
-        teeth = comb_analysis.get('mz_comb_details', [])
-        
-        if omega > 0 and teeth:
-            # Mark Omega value
-            ax2.axvline(x=omega, color='purple', linestyle='-.',
-                       label=f'Ω = {omega:.3f}', alpha=0.7)
-            
-            # Mark each tooth with a vertical line
-            for tooth in teeth:
-                freq = tooth.get('freq', 0)
-                amp = tooth.get('amplitude', 0)
-                tooth_num = tooth.get('tooth_number', 0)
-                
-                if tooth_num <= 3:  # Label only first few teeth
-                    ax2.axvline(x=freq, color='orange', linestyle=':',
-                              label=f'{tooth_num}Ω = {freq:.3f}', alpha=0.6)
-                else:
-                    ax2.axvline(x=freq, color='orange', linestyle=':', alpha=0.4)
-                
-                # Add a marker at the peak
-                ax2.plot(freq, amp, 'o', color='orange', markersize=5)
-    
-    # Add legends
-    ax1.legend(loc='upper right')
-    ax2.legend(loc='upper right')
-    
-    # Adjust layout
-    plt.tight_layout()
-    
-    # Save the figure if a path is provided
-    if save_path:
-        fig_filename = os.path.join(save_path, f"{save_prefix}_analysis.png")
-        fig.savefig(fig_filename, dpi=150, bbox_inches='tight')
-        plt.close(fig)
-        return fig_filename
-    
-    # Show if requested (and return figure)
-    if show_plot:
-        plt.show()
-    else:
-        plt.close(fig)
-    
-    return fig
+            # Mark Omega value, then each tooth with a vertical line and a marker at the peak
+            overlays.append({'axis': axis, 'type': 'axvline', 'x': omega, 'label': f'Ω = {omega:.3f}',
+                             'style': {'color': 'purple', 'linestyle': '-.', 'alpha': 0.7}})
+            overlays.append({'axis': axis, 'type': 'teeth',
+                             'freqs': [tooth.get('freq', 0) for tooth in teeth],
+                             'numbers': [tooth.get('tooth_number', 0) for tooth in teeth],
+                             'label_fmt': '{n}Ω = {freq:.3f}',
+                             'amplitudes': [tooth.get('amplitude', 0) for tooth in teeth]})
+    
+    return _plot_spectrum(analysis, overlays, plot_title, show_plot, save_path, save_prefix,
+                          figsize=(12, 10), line_alpha=0.5,
+                          data_description=' frequency comb analysis',
+                          max_freq_display=max_freq_display, max_points=max_points)
 
 def plot_log_comb_analysis(analysis, log_comb_analysis, 
                          plot_title='Logarithmic Frequency Comb Analysis',
@@ -291,106 +529,63 @@ def plot_log_comb_analysis(analysis, log_comb_analysis,
     """
     Plot logarithmic frequency comb analysis, highlighting detected log-comb structures.
     """
-    # Get frequency data
-    pos_freqs = analysis.get('positive_frequencies', np.array([]))
-    mx_fft_amp = analysis.get('mx_fft_pos', np.array([]))
-    mz_fft_amp = analysis.get('mz_fft_pos', np.array([]))
-    
-    if pos_freqs.size == 0 or mx_fft_amp.size == 0 or mz_fft_amp.size == 0:
-        print("Warning: Missing FFT data for plotting log-comb analysis.")
-        return None
-    
-    # Create figure - with logarithmic x-axis
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10))
-    
-    # Plot FFT for X component on log scale
-    ax1.semilogx(pos_freqs[1:], mx_fft_amp[1:], 'r-', label='FFT(<X>)', alpha=0.5)  # Skip DC
-    ax1.set_ylabel('|FFT(<X>)|')
-    ax1.set_title(f'{plot_title} - X Component')
-    ax1.grid(True, linestyle='--', alpha=0.6, which='both')
-    
-    # Plot FFT for Z component on log scale
-    ax2.semilogx(pos_freqs[1:], mz_fft_amp[1:], 'b-', label='FFT(<Z>)', alpha=0.5)  # Skip DC
-    ax2.set_xlabel('Frequency (log scale)')
-    ax2.set_ylabel('|FFT(<Z>)|')
-    ax2.set_title('Z Component')
-    ax2.grid(True, linestyle='--', alpha=0.6, which='both')
+    overlays = []
     
     # Highlight detected logarithmic combs
-    # X component log comb
-    if log_comb_analysis.get('mx_log_comb_found', False):
-        r_factor = log_comb_analysis.get('mx_best_r', 0)
-        base_freq = log_comb_analysis.get('mx_base_freq', 0)
-        teeth = log_comb_analysis.get('mx_log_comb_teeth', [])
+    for axis, component in ((1, 'mx'), (2, 'mz')):
+        if not log_comb_analysis.get(f'{component}_log_comb_found', False):
+            continue
+        r_factor = log_comb_analysis.get(f'{component}_best_r', 0)
+        base_freq = log_comb_analysis.get(f'{component}_base_freq', 0)
+        teeth = log_comb_analysis.get(f'{component}_log_comb_teeth', [])
         
         if r_factor > 0 and base_freq > 0 and teeth:
-            # Mark base frequency
-            ax1.axvline(x=base_freq, color='purple', linestyle='-.',
-                       label=f'Base = {base_freq:.3f}, R = {r_factor:.3f}', alpha=0.7)
-            
-            # Mark each tooth with a vertical line
-            for tooth in teeth:
-                freq = tooth.get('actual_freq', 0)
-                expected = tooth.get('expected_freq', 0)
-                tooth_num = tooth.get('tooth_number', 0)
-                
-                if freq > 0:
-                    if tooth_num <= 3:  # Label only first few teeth
-                        ax1.axvline(x=freq, color='orange', linestyle=':',
-                                  label=f'n={tooth_num}: {freq:.3f}', alpha=0.6)
-                    else:
-                        ax1.axvline(x=freq, color='orange', linestyle=':', alpha=0.4)
-    
-    # Z component log comb
-    if log_comb_analysis.get('mz_log_comb_found', False):
-        r_factor = log_comb_analysis.get('mz_best_r', 0)
-        base_freq = log_comb_analysis.get('mz_base_freq', 0)
-        teeth = log_comb_analysis.get('mz_log_comb_teeth', [])
-        
-        if r_factor > 0 and base_freq > 0 and teeth:
-            # Mark base frequency
-            ax2.axvline(x=base_freq, color='purple', linestyle='-.',
-                       label=f'Base = {base_freq:.3f}, R = {r_factor:.3f}', alpha=0.7)
-            
-            # Mark each tooth with a vertical line
-            for tooth in teeth:
-                freq = tooth.get('actual_freq', 0)
-                expected = tooth.get('expected_freq', 0)
-                tooth_num = tooth.get('tooth_number', 0)
-                
-                if freq > 0:
-                    if tooth_num <= 3:  # Label only first few teeth
-                        ax2.axvline(x=freq, color='orange', linestyle=':',
-                                  label=f'n={tooth_num}: {freq:.3f}', alpha=0.6)
-                    else:
-                        ax2.axvline(x=freq, color='orange', linestyle=':', alpha=0.4)
-    
-    # Add legends
-    ax1.legend(loc='upper right')
-    ax2.legend(loc='upper right')
-    
-    # Adjust layout
-    plt.tight_layout()
-    
-    # Save the figure if a path is provided
-    if save_path:
-        fig_filename = os.path.join(save_path, f"{save_prefix}_analysis.png")
-        fig.savefig(fig_filename, dpi=150, bbox_inches='tight')
-        plt.close(fig)
-        return fig_filename
-    
-    # Show if requested (and return figure)
-    if show_plot:
-        plt.show()
-    else:
-        plt.close(fig)
+            # Mark base frequency, then each found tooth with a vertical line
+            overlays.append({'axis': axis, 'type': 'axvline', 'x': base_freq,
+                             'label': f'Base = {base_freq:.3f}, R = {r_factor:.3f}',
+                             'style': {'color': 'purple', 'linestyle': '-.', 'alpha': 0.7}})
+            found_teeth = [tooth for tooth in teeth if tooth.get('actual_freq', 0) > 0]
+            overlays.append({'axis': axis, 'type': 'teeth',
+                             'freqs': [tooth['actual_freq'] for tooth in found_teeth],
+                             'numbers': [tooth.get('tooth_number', 0) for tooth in found_teeth],
+                             'label_fmt': 'n={n}: {freq:.3f}'})
+    
+    return _plot_spectrum(analysis, overlays, plot_title, show_plot, save_path, save_prefix,
+                          figsize=(12, 10), line_alpha=0.5,
+                          data_description=' log-comb analysis', log_x=True)
+
+# Rendered circuit diagrams by (circuit type, qubits, time, format, circuit hash),
+# so an identical diagram is copied instead of re-rendered by Qiskit's drawer. Each
+# render is kept under a name derived from its key in a private temporary folder:
+# the save_path files can be overwritten by a different diagram of the same type.
+_CIRCUIT_DIAGRAM_CACHE = {}
+_CIRCUIT_DIAGRAM_CACHE_SIZE = 64
+_CIRCUIT_DIAGRAM_DIR = None
+
+def _circuit_diagram_cache_file(cache_key, image_format):
+    """
+    Content-addressed path for a cached circuit diagram render.
     
-    return fig
+    Args:
+        cache_key (tuple): Circuit diagram cache key
+        image_format (str): Image format (file extension)
+        
+    Returns:
+        str: File path inside the diagram cache folder
+    """
+    global _CIRCUIT_DIAGRAM_DIR
+    if _CIRCUIT_DIAGRAM_DIR is None:
+        _CIRCUIT_DIAGRAM_DIR = tempfile.mkdtemp(prefix='qat_circuit_diagrams_')
+    digest = hashlib.sha1(repr(cache_key).encode()).hexdigest()
+    return os.path.join(_CIRCUIT_DIAGRAM_DIR, f"{digest}.{image_format}")
 
 def plot_circuit_diagram(circuit, time_value=None, circuit_type='', 
-                       qubit_count=None, save_path=None):
+                       qubit_count=None, save_path=None, image_format='svg'):
     """
     Plot the quantum circuit diagram.
+    
+    The diagram is vector content (gates and wires), so it is saved as SVG by
+    default and scaled by the browser; pass image_format='png' for a raster file.
     """
     # Skip parameter binding - works with both old and new Qiskit versions
     # We'll just use the original circuit and add a note in the title
@@ -398,7 +593,17 @@ def plot_circuit_diagram(circuit, time_value=None, circuit_type='',
     
     # Create the figure and draw the circuit
     try:
-        fig, ax = plt.subplots(figsize=(12, min(10, 1 + 0.7 * bound_circuit.num_qubits)))
+        if save_path:
+            fig_filename = os.path.join(save_path, f"circuit_diagram_{circuit_type}.{image_format}")
+            cache_key = (circuit_type, qubit_count, time_value, image_format,
+                         hashlib.sha1(str(bound_circuit).encode()).hexdigest())
+            cached_filename = _CIRCUIT_DIAGRAM_CACHE.get(cache_key)
+            if cached_filename and os.path.exists(cached_filename):
+                shutil.copyfile(cached_filename, fig_filename)
+                return fig_filename
+        
+        fig, ax = _new_figure(not save_path, figsize=(12, min(10, 1 + 0.7 * bound_circuit.num_qubits)))
+        ax.grid(False)  # No plot grid (rcParams) behind the circuit
         
         try:
             circuit_drawing = bound_circuit.draw(output='mpl', ax=ax)
@@ -416,14 +621,25 @@ def plot_circuit_diagram(circuit, time_value=None, circuit_type='',
             title += f" (t={time_value:.2f})"
         ax.set_title(title)
         
-        # Adjust layout
-        plt.tight_layout()
-        
         # Save if path provided
         if save_path:
-            fig_filename = os.path.join(save_path, f"circuit_diagram_{circuit_type}.png")
-            plt.savefig(fig_filename, dpi=150, bbox_inches='tight')
-            plt.close(fig)
+            cached_filename = _circuit_diagram_cache_file(cache_key, image_format)
+            if image_format == 'png':
+                _write_figure(fig, cached_filename, 'png', dpi=SAVEFIG_DPI, bbox_inches='tight', pil_kwargs=PNG_SAVE_OPTIONS)
+            else:
+                # No tight bbox pass: the constrained layout already fits the figure
+                _write_figure(fig, cached_filename, image_format)
+            shutil.copyfile(cached_filename, fig_filename)
+            
+            if len(_CIRCUIT_DIAGRAM_CACHE) >= _CIRCUIT_DIAGRAM_CACHE_SIZE:
+                # Drop the oldest entry and its render
+                oldest_filename = _CIRCUIT_DIAGRAM_CACHE.pop(next(iter(_CIRCUIT_DIAGRAM_CACHE)), None)
+                if oldest_filename:
+                    try:
+                        os.remove(oldest_filename)
+                    except OSError:
+                        pass
+            _CIRCUIT_DIAGRAM_CACHE[cache_key] = cached_filename
             return fig_filename
         
         # Display and return
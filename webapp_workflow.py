@@ -2,8 +2,9 @@
 Script to start the quantum simulation web application.
 """
 import os
+import config
 from app import app
 
 if __name__ == "__main__":
     print("Starting Quantum Simulation Web Interface")
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000, debug=config.FLASK_DEBUG, threaded=True)
\ No newline at end of file